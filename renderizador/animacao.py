@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Renderização de animações em sequências de quadros.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+import sys
+import json         # Registros do manifesto de quadros prontos
+import time         # Para operações com tempo, como o tempo restante
+import functools
+import threading
+import multiprocessing
+
+import gpu          # Simula os recursos de uma GPU
+import cache        # Hash do conteúdo dos arquivos
+import saida        # Grava os quadros em segundo plano
+import pipeline     # Traversal, raster e gravação sobrepostos
+
+# Com o relógio simulado cada quadro só depende do seu instante, então os quadros podem
+# ser divididos entre processos. Cada processo lê e compila a cena uma única vez (no
+# initializer do Pool) e depois só renderiza os quadros que recebe; o processo principal
+# recebe as imagens na ordem dos quadros e grava uma por vez. Os processos são criados com
+# "spawn" para não herdar o estado já configurado das classes estáticas (GL, Rasterizer,
+# RenderProcesses), cujo setup não pode ser repetido.
+
+_renderer = None  # Renderizador do processo de trabalho
+
+
+class Manifest:
+    """Registro dos quadros já gravados, para retomar uma renderização interrompida."""
+
+    # Arquivo ao lado das imagens (ex.: tela.manifest para tela0000.png, tela0001.png, ...),
+    # uma linha JSON por registro: a primeira com a configuração da renderização (cena, hash
+    # do X3D, resolução e amostragem) e depois uma por quadro gravado (instante, arquivo,
+    # tamanho e hash). Só se acrescentam linhas, então gravar um quadro não reescreve o
+    # arquivo; uma última linha cortada por uma interrupção é ignorada na leitura.
+
+    def __init__(self, settings):
+        """Lê o manifesto existente, que só vale se a configuração for a mesma."""
+        self.filename = gpu.GPU.image_file.split('.')[0] + ".manifest"
+        self.settings = settings
+        self.frames = {}  # quadro -> registro
+        self.file = None
+        self.lock = threading.Lock()  # registros chegam das threads de gravação
+        self.partial = False  # se a última linha foi cortada
+
+        try:
+            with open(self.filename, "r", encoding="utf-8") as file:
+                content = file.read()
+        except (OSError, ValueError):
+            return
+
+        records = []
+        self.partial = not content.endswith("\n")
+        for line in content.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        if not records or records[0] != {"settings": settings}:
+            return  # outra cena ou configuração, começa do zero
+        for record in records[1:]:
+            self.frames[record["frame"]] = record
+
+    def done(self, frame, timestamp):
+        """Se o quadro já foi gravado nesse instante e o arquivo em disco confere."""
+        record = self.frames.get(frame)
+        if record is None or record["timestamp"] != timestamp:
+            return False
+        filename = gpu.GPU.frame_file(frame)
+        try:
+            if os.path.getsize(filename) != record["size"]:
+                return False
+            return cache.content_hash(filename) == record["hash"]
+        except OSError:
+            return False
+
+    def open(self):
+        """Abre o manifesto para acrescentar registros, recriando-o se não valia."""
+        if self.frames:
+            self.file = open(self.filename, "a", encoding="utf-8")
+            if self.partial:
+                self.file.write("\n")  # termina a linha cortada, que segue ignorada
+        else:
+            self.file = open(self.filename, "w", encoding="utf-8")
+            self.write({"settings": self.settings})
+
+    def record(self, frame, timestamp, filename):
+        """Registra um quadro que acabou de ser gravado em filename."""
+        record = {
+            "frame": frame,
+            "timestamp": timestamp,
+            "file": os.path.basename(filename),
+            "size": os.path.getsize(filename),
+            "hash": cache.content_hash(filename),
+        }
+        self.frames[frame] = record
+        self.write(record)
+
+    def write(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())  # registro no disco antes de seguir para o próximo quadro
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Progress:
+    """Mostra quantos quadros já foram gravados, a taxa e o tempo restante estimado."""
+
+    def __init__(self, total):
+        """Começa a contar o tempo para total quadros."""
+        self.total = total
+        self.done = 0
+        self.start = time.time()
+
+    def update(self):
+        """Conta mais um quadro pronto e mostra o progresso."""
+        self.done += 1
+        elapsed = time.time() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0
+        remaining = (self.total - self.done) / rate if rate > 0 else 0
+        print("Frame %d/%d (%.2f frames/s, ETA %s)" %
+              (self.done, self.total, rate, Progress.format(remaining)), flush=True)
+
+    @staticmethod
+    def format(seconds):
+        """Formata segundos como h:mm:ss."""
+        seconds = int(round(seconds))
+        return "%d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def _start_worker(settings):
+    """Prepara o processo de trabalho: lê e compila a cena uma única vez."""
+    global _renderer
+    sys.stdout = open(os.devnull, "w")  # as mensagens de cada quadro encobririam o progresso
+
+    import renderizador  # aqui para evitar importação circular com o processo principal
+    _renderer = renderizador.Renderizador()
+    _renderer.x3d_file = settings["x3d_file"]
+    _renderer.image_file = settings["image_file"]
+    _renderer.width = settings["width"]
+    _renderer.height = settings["height"]
+    _renderer.buffers = settings["buffers"]
+    _renderer.depth_format = settings["depth_format"]
+    _renderer.window = settings["window"]
+    _renderer.load(settings["no_cache"], sampling=settings["sampling"])
+    if settings["auxiliary"]:
+        _renderer.set_auxiliary(settings["positions"])
+
+def _render_frame(job):
+    """Renderiza um quadro no processo de trabalho."""
+    frame, timestamp = job
+    image = _renderer.render(timestamp).copy()
+    _renderer.save_auxiliary(frame)
+    return frame, timestamp, image
+
+def _frames(renderer, work, jobs, no_cache, pipelined=False):
+    """Renderiza os quadros de work, no próprio processo ou num Pool, e os devolve em ordem."""
+    import gl  # amostragem escolhida no processo principal, repassada aos outros
+
+    if jobs <= 1 or len(work) <= 1:
+        if pipelined and pipeline.Pipeline.supported():
+            yield from pipeline.Pipeline(renderer).frames(work)
+            return
+        for frame, timestamp in work:
+            image = renderer.render(timestamp)
+            renderer.save_auxiliary(frame)
+            yield frame, timestamp, image
+        return
+
+    settings = {
+        "x3d_file": renderer.x3d_file,
+        "image_file": renderer.image_file,
+        "width": renderer.width,
+        "height": renderer.height,
+        "buffers": renderer.buffers,
+        "depth_format": renderer.depth_format,
+        "window": renderer.window,
+        "auxiliary": renderer.auxiliary is not None,
+        "positions": renderer.auxiliary is not None and renderer.auxiliary.positions,
+        "sampling": gl.GL.sampling_X_,
+        "no_cache": no_cache,
+    }
+
+    jobs = min(jobs, len(work))
+    print("Rendering %d frames with %d processes" % (len(work), jobs), flush=True)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(jobs, initializer=_start_worker, initargs=(settings,)) as pool:
+        # imap devolve na ordem dos quadros, mesmo que terminem fora de ordem
+        yield from pool.imap(_render_frame, work)
+
+def render(renderer, clock, frames, jobs=1, no_cache=False, writers=2, level=None,
+           pipelined=False, sizes=None):
+    """Renderiza e grava os quadros 0 até frames - 1 nos instantes dados por clock."""
+    # Com jobs igual a 1 renderiza no próprio processo, com 0 usa um processo por núcleo.
+    # A gravação (e o registro no Manifest) acontece em segundo plano no FrameSink, com
+    # writers threads codificando as imagens (level é a compressão do PNG); com writers
+    # igual a 0 cada quadro é gravado na hora, sem thread nenhuma. Com pipelined
+    # o traversal de um quadro acontece junto com o raster do anterior (ver pipeline), e
+    # sizes são tamanhos reduzidos gravados junto com cada quadro (ver saida.PyramidWriter).
+    # Numa sequência de imagens os quadros já gravados por uma execução anterior são
+    # pulados; um vídeo (.y4m) é sempre gravado inteiro.
+    import gl
+
+    jobs = jobs or os.cpu_count() or 1
+    writer = saida.writer(renderer.image_file, getattr(clock, "fps", 30), level, sizes)
+    work = [(frame, clock.time(frame)) for frame in range(frames)]
+
+    manifest = None
+    if isinstance(writer, saida.SequenceWriter):
+        settings = {
+            "x3d_file": os.path.abspath(renderer.x3d_file),
+            "hash": cache.content_hash(renderer.x3d_file),
+            "width": renderer.width,
+            "height": renderer.height,
+            "sampling": gl.GL.sampling_X_,
+            "depth_format": renderer.depth_format,  # a precisão muda quem ganha o teste
+        }
+        if renderer.window:  # só um recorte da imagem (--crop)
+            settings["window"] = list(renderer.window)
+        if renderer.auxiliary is not None:  # os planos auxiliares saem junto com cada quadro
+            settings["auxiliary"] = True
+            settings["positions"] = renderer.auxiliary.positions
+        if sizes:  # os quadros gravados sem essas reduções precisam ser refeitos
+            settings["sizes"] = [list(size) for size in sizes]
+        manifest = Manifest(settings)
+        work = [(frame, timestamp) for frame, timestamp in work
+                if not manifest.done(frame, timestamp)]
+        if len(work) < frames:
+            print("Resuming: %d of %d frames already rendered" % (frames - len(work), frames))
+        manifest.open()
+    progress = Progress(len(work))
+
+    sink = saida.FrameSink(writer, writers) if writers > 0 else None
+    try:
+        for frame, timestamp, image in _frames(renderer, work, jobs, no_cache, pipelined):
+            done = None if manifest is None else functools.partial(manifest.record, frame, timestamp)
+            if sink is not None:
+                sink.submit(image, frame, done)
+            else:  # sem threads de gravação: grava na hora, antes do próximo quadro
+                name = writer.write(image, frame)
+                if done is not None:
+                    done(name)
+            progress.update()
+    finally:
+        if sink is not None:
+            sink.close()
+        else:
+            writer.close()
+        if manifest is not None:
+            manifest.close()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Cache de cenas X3D compiladas.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+import json         # Cabeçalho com a estrutura da cena
+import struct       # Campos binários de tamanho fixo do cabeçalho
+import hashlib      # Hash do conteúdo do arquivo X3D
+import time
+
+# Numpy
+import numpy as np
+
+import x3d          # Classes dos nós X3D a serem reconstruídas
+
+# Formato do arquivo .x3dc (sem pickle):
+#   MAGIC (8 bytes) | VERSION (uint32) | tamanho do cabeçalho (uint64) | cabeçalho JSON |
+#   preenchimento até múltiplo de ALIGN | arrays crus das geometrias (cada um alinhado)
+# O cabeçalho guarda a chave (caminho, mtime, tamanho e hash do X3D), a árvore de nós com
+# os campos simples e, para os campos MF* (x3d.MFArray), a posição dos dados crus no final.
+# Nós compartilhados (DEF/USE) são gravados uma única vez e depois referenciados por "ref".
+MAGIC = b"X3DCACHE"
+VERSION = 3
+ALIGN = 64
+PREFIX = struct.Struct("<8sIQ")
+
+CACHE_DIR = "__x3dcache__"  # diretório criado ao lado do arquivo X3D
+
+
+def cache_path(filename):
+    """Retorna o arquivo de cache para um arquivo X3D."""
+    source = os.path.abspath(filename)
+    folder, name = os.path.split(source)
+    return os.path.join(folder, CACHE_DIR, name + ".x3dc")
+
+def content_hash(filename):
+    """Calcula o hash do conteúdo do arquivo X3D."""
+    digest = hashlib.sha1()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _align(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+def _fields(node):
+    """Campos preenchidos do nó, declarados nos __slots__ de cada classe da hierarquia."""
+    for cls in reversed(type(node).__mro__):
+        for field in cls.__dict__.get("__slots__", ()):
+            if hasattr(node, field):
+                yield field, getattr(node, field)
+
+def _node_classes():
+    classes = {}
+    for name, cls in vars(x3d).items():
+        if isinstance(cls, type) and issubclass(cls, (x3d.X3DNode, x3d.Scene, x3d.ROUTE)):
+            classes[name] = cls
+    return classes
+
+
+class _Encoder:
+    """Converte a árvore de nós X3D em um cabeçalho JSON e uma lista de arrays."""
+
+    def __init__(self):
+        self.arrays = []
+        self.nodes = {}  # id do nó -> posição em que foi gravado pela primeira vez
+
+    def value(self, value):
+        if isinstance(value, np.ndarray):
+            return self.array(value)
+        if isinstance(value, list):
+            return [self.value(v) for v in value]
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return self.node(value)
+
+    def array(self, values):
+        self.arrays.append(np.ascontiguousarray(values))
+        return {"array": len(self.arrays) - 1}
+
+    def node(self, node):
+        if id(node) in self.nodes:
+            return {"ref": self.nodes[id(node)]}
+        self.nodes[id(node)] = len(self.nodes)
+        return {"class": type(node).__name__,
+                "fields": {k: self.value(v) for k, v in _fields(node)}}
+
+
+class _Decoder:
+    """Reconstrói os nós X3D a partir do cabeçalho e dos arrays mapeados em memória."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.classes = _node_classes()
+        self.nodes = []  # nós na ordem em que foram reconstruídos, para resolver "ref"
+
+    def value(self, value):
+        if isinstance(value, list):
+            return [self.value(v) for v in value]
+        if isinstance(value, dict):
+            if "array" in value:
+                return self.arrays[value["array"]]
+            if "ref" in value:
+                return self.reference(self.nodes[value["ref"]])
+            return self.node(value)
+        return value
+
+    def node(self, data):
+        cls = self.classes[data["class"]]  # só aceita classes de nós do x3d
+        node = cls.__new__(cls)
+        self.nodes.append(node)
+        for field, value in data["fields"].items():
+            setattr(node, field, self.value(value))
+
+        # Repete os efeitos colaterais que a construção a partir do XML teria
+        if isinstance(node, x3d.X3DNode) and hasattr(node, "name"):
+            x3d.X3DNode.named_nodes[node.name] = node
+        if isinstance(node, x3d.Appearance):
+            x3d.X3D.current_appearance = node
+        if hasattr(node, "add_preview"):
+            node.add_preview()
+        return node
+
+    def reference(self, node):
+        if isinstance(node, x3d.Appearance):  # como um USE de Appearance no parse
+            x3d.X3D.current_appearance = node
+        return node
+
+
+def save(scene):
+    """Grava a cena já lida (X3D.parse) no cache compilado."""
+    start_time = time.time()
+    source = os.path.abspath(scene.filename)
+    stat = os.stat(source)
+
+    encoder = _Encoder()
+    header = {
+        "source": source,
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": content_hash(source),
+        "scene": encoder.value(scene.scene),
+        "arrays": [],
+    }
+
+    offset = 0
+    for array in encoder.arrays:
+        header["arrays"].append([array.dtype.str, offset, array.size])
+        offset = _align(offset + array.nbytes)
+
+    data = json.dumps(header).encode("utf-8")
+    start = _align(PREFIX.size + len(data))
+
+    filename = cache_path(source)
+    temporary = filename + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(temporary, "wb") as file:
+            file.write(PREFIX.pack(MAGIC, VERSION, len(data)))
+            file.write(data)
+            for array, (_, position, _) in zip(encoder.arrays, header["arrays"]):
+                file.seek(start + position)
+                file.write(array.tobytes())
+        os.replace(temporary, filename)  # troca atômica, nunca deixa cache pela metade
+    except OSError as error:
+        print("Could not write scene cache: %s" % error)
+        return False
+
+    print("::: Time to write scene cache: %s seconds :::" % (time.time() - start_time))
+    return True
+
+def load(scene):
+    """Carrega a cena do cache compilado se ele ainda for válido, retorna se conseguiu."""
+    start_time = time.time()
+    source = os.path.abspath(scene.filename)
+    filename = cache_path(source)
+
+    try:
+        stat = os.stat(source)
+        with open(filename, "rb") as file:
+            magic, version, length = PREFIX.unpack(file.read(PREFIX.size))
+            if magic != MAGIC or version != VERSION:
+                return False
+            header = json.loads(file.read(length).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return False
+
+    # Chave: caminho, tamanho e mtime; se só o mtime mudou confere o hash do conteúdo
+    if header["source"] != source or header["size"] != stat.st_size:
+        return False
+    if header["mtime"] != stat.st_mtime_ns and header["hash"] != content_hash(source):
+        return False
+
+    start = _align(PREFIX.size + length)
+    arrays = []
+    if header["arrays"]:
+        data = np.memmap(filename, dtype=np.uint8, mode="r", offset=start)
+        for dtype, offset, count in header["arrays"]:
+            dtype = np.dtype(dtype)
+            array = data[offset:offset + count * dtype.itemsize].view(dtype)
+            arrays.append(array.view(x3d.MFArray))
+
+    scene.scene = _Decoder(arrays).value(header["scene"])
+
+    print("::: Time to load scene cache: %s seconds :::" % (time.time() - start_time))
+    return True
@@ -35,29 +35,80 @@ class GL:
     point_to_screen = None
     transformation_matrix_stack = None
     model_to_world = []
+    view = None          # (posição, orientação, campo de visão) da câmera atual
+    view_version = 0     # incrementa quando a câmera muda, suja as MVPs guardadas
+    transforms = []      # pilha de TransformCache dos Transforms em que se entrou
+    transform_cache = {} # (id do TransformCache pai, id do nó) -> TransformCache
+    tessellations = {}  # tesselações de Box e Sphere, compartilhadas por tamanho/raio
+    instancing = True   # agrupa as cópias de uma mesma malha e transforma todas em lote
+    instances = {}      # id da malha -> (vértices, [RetainedGeometry, ...]) do quadro atual
+    submitted = []      # (RetainedGeometry, draw, estado) do quadro atual, na ordem do traversal
+    retain = True       # guarda os vértices transformados das malhas que não se moveram
+    retained = {}       # (id da malha, id da MVP) -> RetainedGeometry do quadro anterior
+    retained_frame = {} # entradas usadas no quadro atual, as demais são descartadas no fim
+    direct = None       # chamadas que desenham direto na GPU guardadas para o raster, None desenha na hora
+    window = None       # (x, y, largura, altura) da imagem que é renderizada, None é a imagem toda
 
     @staticmethod
-    def setup(width, height, near=0.01, far=1000):
+    def setup(width, height, near=0.01, far=1000, sampling=None, window=None):
         """Define parametros para câmera de razão de aspecto, plano próximo e distante."""
+        # Sem sampling a amostragem é perguntada ao usuário (ex.: os processos que
+        # renderizam quadros em paralelo recebem a escolhida no processo principal).
+        # Com window só essa parte da imagem é renderizada (ver set_window).
         print("\n=== Rasterizer Setup ===")
         GL.width = width
         GL.height = height
+        GL.window = window
         GL.near = near
         GL.far = far
 
-        try:
-            s = int(input("\nSampling nXn: (ex: 2 is 2x2, 3 is 3x3, ...)\nDefault is 2x2, press enter to use default.\n"))
-            GL.sampling_X_ = s
+        if sampling is not None:
+            GL.sampling_X_ = sampling
+        else:
+            try:
+                s = int(input("\nSampling nXn: (ex: 2 is 2x2, 3 is 3x3, ...)\nDefault is 2x2, press enter to use default.\n"))
+                GL.sampling_X_ = s
 
-        except: 
-            print("Using default 2x2 sampling")
+            except: 
+                print("Using default 2x2 sampling")
 
         print("Sampling: " + str(GL.sampling_X_) + "X" + str(GL.sampling_X_))
 
-        utils.Rasterizer.setup(gpu.GPU, GL.width, GL.height, GL.sampling_X_, True)
+        utils.Rasterizer.setup(gpu.GPU, GL.width, GL.height, GL.sampling_X_, True, window, near, far)
+        utils.RenderProcesses.post_render.insert(0, GL.draw_instances)  # antes do sample
         GL.point_to_screen = utils.point_screen(width, height)
         print("\n======================================================================")
 
+    @staticmethod
+    def set_window(x, y, width, height):
+        """Passa a renderizar só a janela (x, y, largura, altura) da imagem, em pixels."""
+        # A câmera continua a da imagem inteira (GL.width x GL.height), então os pixels da
+        # janela saem iguais aos do quadro inteiro; o Rasterizer só guarda a janela.
+        GL.window = (x, y, width, height)
+        utils.Rasterizer.resize(x, y, width, height)
+
+    @staticmethod
+    def set_scissor(region):
+        """Limita o raster e a resolução ao retângulo (x, y, largura, altura), None desliga."""
+        # O resto da imagem continua o último resolvido, assim um pedaço danificado pode ser
+        # renderizado de novo sem o custo do quadro inteiro.
+        if region is None:
+            utils.Rasterizer.set_scissor(None)
+        else:
+            x, y, width, height = region
+            utils.Rasterizer.set_scissor((x, y, x + width, y + height))
+
+    @staticmethod
+    def gpu_routine(routine):
+        """Rotina que desenha direto na GPU, guardada em GL.direct se houver essa lista."""
+        # No pipeline o traversal de um quadro acontece enquanto o anterior ainda ocupa a
+        # GPU, então essas chamadas só são feitas no estágio de raster (ver pipeline).
+        def call(*args, **kwargs):
+            if GL.direct is None:
+                return routine(*args, **kwargs)
+            GL.direct.append((routine, args, kwargs))
+        return call
+
     @staticmethod
     def viewpoint(position, orientation, fieldOfView):
         """Função usada para renderizar (na verdade coletar os dados) de Viewpoint."""
@@ -66,11 +117,17 @@ class GL:
         # perspectiva para poder aplicar nos pontos dos objetos geométricos.
 
         print("\n=== Viewpoint ===")
+        view = (tuple(position), tuple(orientation), fieldOfView)
+        if view == GL.view:
+            return  # câmera parada, as matrizes (e as MVPs guardadas) continuam valendo
+
         GL.view_to_point = utils.view_point(fieldOfView, GL.near, GL.far, GL.width, GL.height)
         GL.world_to_view = utils.world_view_lookat_simple(position, orientation)
+        GL.view = view
+        GL.view_version += 1
 
     @staticmethod
-    def transform_in(translation, scale, rotation):
+    def transform_in(translation, scale, rotation, node=None):
         """Função usada para renderizar (na verdade coletar os dados) de Transform."""
         # A função transform_in será chamada quando se entrar em um nó X3D do tipo Transform
         # do grafo de cena. Os valores passados são a escala em um vetor [x, y, z]
@@ -81,11 +138,33 @@ class GL:
         # modelos do mundo em alguma estrutura de pilha.
 
         print("\n=== Transform in ===")
-        GL.transformation_matrix_stack = utils.model_world(translation, rotation, scale)
-        if len(GL.model_to_world) > 0: GL.transformation_matrix_stack = np.dot(GL.model_to_world[len(GL.model_to_world) - 1], GL.transformation_matrix_stack)
-
-        GL.model_to_world += [GL.transformation_matrix_stack]
-        GL.mvp = utils.mvp(GL)
+        parent = GL.transforms[-1] if GL.transforms else None
+        if node is None:  # sem o nó não há onde guardar, recalcula tudo
+            cache = utils.TransformCache()
+        else:  # um nó usado (USE) sob pais diferentes tem uma entrada por caminho
+            cache = GL.transform_cache.setdefault((id(parent), id(node)), utils.TransformCache())
+
+        if cache.local is None or cache.node_version != node.version:
+            cache.local = utils.model_world(translation, rotation, scale)
+            cache.node_version = node.version if node is not None else None
+            cache.world = None
+
+        parent_version = parent.world_version if parent else 0
+        if cache.world is None or cache.parent_version != parent_version:
+            cache.world = cache.local
+            if parent: cache.world = np.dot(parent.world, cache.local)
+            cache.parent_version = parent_version
+            cache.world_version += 1
+            cache.mvp = None
+
+        GL.transformation_matrix_stack = cache.world
+        if cache.mvp is None or cache.view_version != GL.view_version:
+            cache.mvp = utils.mvp(GL)
+            cache.view_version = GL.view_version
+
+        GL.model_to_world += [cache.world]
+        GL.transforms += [cache]
+        GL.mvp = cache.mvp
 
     @staticmethod
     def transform_out():
@@ -97,7 +176,110 @@ class GL:
 
         print("=== Transform out ===")
         if len(GL.model_to_world) > 0: GL.model_to_world.pop()
+        if len(GL.transforms) > 0: GL.transforms.pop()
     
+    @staticmethod
+    def retained_geometry(point):
+        """Entrada do cache de vértices transformados da malha com a MVP atual."""
+        key = (id(point), id(GL.mvp))
+        entry = GL.retained.get(key) if GL.retain else None
+        if entry is None or entry.point is not point or entry.mvp is not GL.mvp:
+            entry = utils.RetainedGeometry(point, GL.mvp, GL.transformation_matrix_stack)
+        GL.retained_frame[key] = entry
+        return entry
+
+    @staticmethod
+    def draw_retained(entry, draw):
+        """Desenha a malha com os vértices (e o preparo dos triângulos) da entrada."""
+        utils.Rasterizer.setups = entry.setups if GL.retain else None
+        draw(entry.screen_points)
+        utils.Rasterizer.setups = None
+
+    @staticmethod
+    def submit(point, draw, *state):
+        """Envia os vértices de uma malha para serem transformados e desenhados por draw."""
+        # Com instancing a transformação é adiada para o fim do traversal, assim todas as
+        # cópias da mesma malha (DEF/USE ou tesselação compartilhada) sob Transforms
+        # diferentes são transformadas juntas, com as suas matrizes empilhadas.
+        # Malhas cujo Transform e câmera não mudaram desde o quadro anterior reaproveitam
+        # os vértices já transformados, só as que se moveram pagam a transformação.
+        # Em state vão os demais objetos que draw usa (cores, índices...), no modo
+        # incremental do Rasterizer eles identificam o desenho entre um quadro e outro.
+        entry = GL.retained_geometry(point)
+        if utils.Rasterizer.auxiliary:
+            draw = GL.object_draw(draw)
+        if not GL.instancing and not utils.Rasterizer.incremental:
+            if entry.screen_points is None:
+                entry.screen_points = utils.transform_points(point, GL)
+            GL.draw_retained(entry, draw)
+            return
+
+        # O lote é só da transformação: o raster segue a ordem em que as malhas foram
+        # enviadas, que decide os empates do teste de profundidade.
+        _, instances = GL.instances.setdefault(id(point), (point, []))
+        instances.append(entry)
+        GL.submitted.append((entry, draw, state))
+
+    @staticmethod
+    def object_draw(draw):
+        """Desenho que marca as amostras com o id do objeto atual (ver RenderList.object_ids)."""
+        scene = utils.RenderProcesses.scene
+        object_id = scene.current_object if scene is not None else 0
+
+        def call(screen_points):
+            utils.Rasterizer.object_id = object_id
+            draw(screen_points)
+        return call
+
+    @staticmethod
+    def draw_instances():
+        """Transforma em lote as instâncias coletadas no traversal e desenha cada uma."""
+        GL.raster(GL.transform_instances())
+
+    @staticmethod
+    def transform_instances():
+        """Transforma em lote as instâncias do traversal e devolve os desenhos na ordem dele."""
+        # Etapa de vértices do quadro: depois dela o traversal do próximo quadro já pode
+        # começar, os desenhos devolvidos só precisam de GL.raster (ver pipeline).
+        for point, instances in GL.instances.values():
+            pending = {id(entry): entry for entry in instances if entry.screen_points is None}
+            pending = list(pending.values())
+
+            if pending:
+                print("\n--> Transforming %d instance(s) of mesh" % len(pending))
+                start_time = time.time()
+
+                if GL.instancing:
+                    mvps = [entry.mvp for entry in pending]
+                    models = [entry.model for entry in pending]
+                    transformed = utils.transform_instances(point, mvps, models, GL.point_to_screen)
+                else:
+                    transformed = [utils.transform_instances(point, [entry.mvp], [entry.model], GL.point_to_screen)[0]
+                                   for entry in pending]
+
+                print("::: Time to transform instances: %s seconds :::\n" % (time.time() - start_time))
+
+                for entry, screen_points in zip(pending, transformed):
+                    entry.screen_points = screen_points.tolist()
+                    entry.bounds = utils.screen_bounds(screen_points, GL.width * GL.sampling_X_, GL.height * GL.sampling_X_)
+
+        draws = GL.submitted
+        GL.instances = {}
+        GL.submitted = []
+        GL.retained, GL.retained_frame = GL.retained_frame, {}
+        return draws
+
+    @staticmethod
+    def raster(draws, light=None):
+        """Rasteriza os desenhos de um quadro com a luz dada (a atual se None)."""
+        utils.Rasterizer.light = light if light is not None else utils.Light
+
+        # No modo incremental só o que toca as regiões que mudaram é desenhado de novo
+        utils.Rasterizer.begin_frame([((entry,) + state, entry.bounds) for entry, _, state in draws])
+        for entry, draw, _ in draws:
+            if utils.Rasterizer.overlaps(entry.bounds):
+                GL.draw_retained(entry, draw)
+
     @staticmethod
     def triangleSet(point, colors):
         """Função usada para renderizar TriangleSet."""
@@ -113,17 +295,18 @@ class GL:
         # você pode assumir o desenho das linhas com a cor emissiva (emissiveColor).
         # print("TriangleSet")
         
-        ## Transformations
-        screen_points = utils.transform_points(point, GL)
-        
-        ## Raster
-        triangles = []
-        input_color = colors if utils.Light.has_light else colors["diffuseColor"]
+        def draw(screen_points):
+            ## Raster
+            triangles = []
+            input_color = colors if utils.Rasterizer.light.has_light else colors["diffuseColor"]
 
-        for p in range(0, len(screen_points) - 2, 3):
-            triangles += [[screen_points[p], screen_points[p + 1], screen_points[p + 2]]]
-        
-        utils.Rasterizer.render(triangles=triangles, colors=input_color)
+            for p in range(0, len(screen_points) - 2, 3):
+                triangles += [[screen_points[p], screen_points[p + 1], screen_points[p + 2]]]
+            
+            utils.Rasterizer.render(triangles=triangles, colors=input_color)
+
+        ## Transformations
+        GL.submit(point, draw, colors)
 
     @staticmethod
     def triangleStripSet(point, stripCount, colors):
@@ -140,18 +323,19 @@ class GL:
         # todos no sentido horário ou todos no sentido anti-horário, conforme especificado.
         # print("TriangleStripSet")
 
-        ## Transformations
-        screen_points = utils.transform_points(point, GL)
-        
-        ## Raster
-        triangles = []
-        input_color = colors if utils.Light.has_light else colors["diffuseColor"]
+        def draw(screen_points):
+            ## Raster
+            triangles = []
+            input_color = colors if utils.Rasterizer.light.has_light else colors["diffuseColor"]
 
-        for i in range(stripCount[0] - 2):
-            triangles += [[screen_points[i + 2], screen_points[i + 1], screen_points[i]]]
-            if i % 2 == 0: triangles += [[screen_points[i], screen_points[i + 1], screen_points[i + 2]]]
-        
-        utils.Rasterizer.render(triangles=triangles, colors=input_color)
+            for i in range(stripCount[0] - 2):
+                triangles += [[screen_points[i + 2], screen_points[i + 1], screen_points[i]]]
+                if i % 2 == 0: triangles += [[screen_points[i], screen_points[i + 1], screen_points[i + 2]]]
+            
+            utils.Rasterizer.render(triangles=triangles, colors=input_color)
+
+        ## Transformations
+        GL.submit(point, draw, stripCount, colors)
 
     @staticmethod
     def indexedTriangleStripSet(point, index, colors):
@@ -169,18 +353,19 @@ class GL:
         # todos no sentido horário ou todos no sentido anti-horário, conforme especificado.
         # print("IndexedTriangleStripSet")
 
-        ## Transformations
-        screen_points = utils.transform_points(point, GL)
-        
-        ## Raster
-        triangles = []
-        input_color = colors if utils.Light.has_light else colors["diffuseColor"]
+        def draw(screen_points):
+            ## Raster
+            triangles = []
+            input_color = colors if utils.Rasterizer.light.has_light else colors["diffuseColor"]
 
-        for i in range(len(index) - 3):
-            triangles += [[screen_points[index[i + 2]], screen_points[index[i + 1]], screen_points[index[i]]]]
-            if i % 2 == 0: triangles += [[screen_points[index[i]], screen_points[index[i + 1]], screen_points[index[i + 2]]]]
-        
-        utils.Rasterizer.render(triangles=triangles, colors=input_color)
+            for i in range(len(index) - 3):
+                triangles += [[screen_points[index[i + 2]], screen_points[index[i + 1]], screen_points[index[i]]]]
+                if i % 2 == 0: triangles += [[screen_points[index[i]], screen_points[index[i + 1]], screen_points[index[i + 2]]]]
+            
+            utils.Rasterizer.render(triangles=triangles, colors=input_color)
+
+        ## Transformations
+        GL.submit(point, draw, index, colors)
 
     @staticmethod
     def box(size, colors):
@@ -194,6 +379,11 @@ class GL:
 
         # print("Box")
 
+        key = ("Box", tuple(size))
+        if key in GL.tessellations:
+            GL.triangleSet(GL.tessellations[key], colors)
+            return
+
         x = size[0]
         y = size[1]
         z = size[2]
@@ -230,6 +420,7 @@ class GL:
         ]
 
         point = list(sum(point, ()))
+        GL.tessellations[key] = point
         
         ## Raster
         GL.triangleSet(point, colors)
@@ -258,46 +449,48 @@ class GL:
         # implementadado um método para a leitura de imagens.
         # print("IndexedFaceSet : ")
 
+        def draw(screen_points):
+            ## Raster
+            vertex_color = colorPerVertex and color and colorIndex
+            has_texture = texCoord and texCoordIndex and current_texture
+
+            if vertex_color: input_color = []
+            elif utils.Rasterizer.light.has_light: input_color = colors
+            else: input_color = colors["diffuseColor"]
+
+            triangles = []
+            uvs = []
+
+            for i in range(0, len(coordIndex) - 3, 4):
+                triangles += [[screen_points[coordIndex[i]], screen_points[coordIndex[i + 1]], screen_points[coordIndex[i + 2]]]]
+
+                if has_texture:
+                    offset_1 = (texCoordIndex[i]) * 2
+                    offset_2 = (texCoordIndex[i + 1]) * 2
+                    offset_3 = (texCoordIndex[i + 2]) * 2
+
+                    uvs += [[
+                        [texCoord[offset_1], texCoord[offset_1 + 1]],
+                        [texCoord[offset_2], texCoord[offset_2 + 1]],
+                        [texCoord[offset_3], texCoord[offset_3 + 1]]
+                    ]]
+
+                elif vertex_color:
+                    offset_1 = (colorIndex[i]) * 3
+                    offset_2 = (colorIndex[i + 1]) * 3
+                    offset_3 = (colorIndex[i + 2]) * 3
+
+                    input_color += [[
+                        [color[offset_1], color[offset_1 + 1], color[offset_1 + 2]], 
+                        [color[offset_2], color[offset_2 + 1], color[offset_2 + 2]], 
+                        [color[offset_3], color[offset_3 + 1], color[offset_3 + 2]]
+                    ]]
+
+            utils.Rasterizer.render(triangles=triangles, colors=input_color, vertex_color=vertex_color, texture=current_texture, uv=uvs, has_texture=has_texture)
+
         ## Transformations
-        screen_points = utils.transform_points(coord, GL)
-        
-        ## Raster
-        vertex_color = colorPerVertex and color and colorIndex
-        has_texture = texCoord and texCoordIndex and current_texture
-
-        if vertex_color: input_color = []
-        elif utils.Light.has_light: input_color = colors
-        else: input_color = colors["diffuseColor"]
-
-        triangles = []
-        uvs = []
-
-        for i in range(0, len(coordIndex) - 3, 4):
-            triangles += [[screen_points[coordIndex[i]], screen_points[coordIndex[i + 1]], screen_points[coordIndex[i + 2]]]]
-
-            if has_texture:
-                offset_1 = (texCoordIndex[i]) * 2
-                offset_2 = (texCoordIndex[i + 1]) * 2
-                offset_3 = (texCoordIndex[i + 2]) * 2
-
-                uvs += [[
-                    [texCoord[offset_1], texCoord[offset_1 + 1]],
-                    [texCoord[offset_2], texCoord[offset_2 + 1]],
-                    [texCoord[offset_3], texCoord[offset_3 + 1]]
-                ]]
-
-            elif vertex_color:
-                offset_1 = (colorIndex[i]) * 3
-                offset_2 = (colorIndex[i + 1]) * 3
-                offset_3 = (colorIndex[i + 2]) * 3
-
-                input_color += [[
-                    [color[offset_1], color[offset_1 + 1], color[offset_1 + 2]], 
-                    [color[offset_2], color[offset_2 + 1], color[offset_2 + 2]], 
-                    [color[offset_3], color[offset_3 + 1], color[offset_3 + 2]]
-                ]]
-
-        utils.Rasterizer.render(triangles=triangles, colors=input_color, vertex_color=vertex_color, texture=current_texture, uv=uvs, has_texture=has_texture)
+        GL.submit(coord, draw, coordIndex, colorPerVertex, color, colorIndex,
+                  texCoord, texCoordIndex, colors, current_texture)
         
     @staticmethod
     def sphere(radius, colors):
@@ -313,65 +506,73 @@ class GL:
 
         sector_count = 12
         stack_count = 12
-        point = []
+        key = ("Sphere", radius)
+        if key not in GL.tessellations:  # tesselação feita uma vez por raio
+            point = []
+
+            sector_step = 2 * math.pi / sector_count;
+            stack_step = math.pi / stack_count;
+
+            for i in range(stack_count):
+                stack_angle = math.pi / 2 - i * stack_step;
+                xy = radius * math.cos(stack_angle);
+                z = radius * math.sin(stack_angle);
 
-        sector_step = 2 * math.pi / sector_count;
-        stack_step = math.pi / stack_count;
+                for j in range(sector_count):
+                    sector_angle = j * sector_step
 
-        for i in range(stack_count):
-            stack_angle = math.pi / 2 - i * stack_step;
-            xy = radius * math.cos(stack_angle);
-            z = radius * math.sin(stack_angle);
+                    x = xy * math.cos(sector_angle);
+                    y = xy * math.sin(sector_angle);
+                    point += [x, y, z];
 
-            for j in range(sector_count):
-                sector_angle = j * sector_step
+            GL.tessellations[key] = point
 
-                x = xy * math.cos(sector_angle);
-                y = xy * math.sin(sector_angle);
-                point += [x, y, z];
+        point = GL.tessellations[key]
         
-        ## Transformations
-        screen_points = utils.transform_points(point, GL)
-        indices = []
-        triangles = []
+        def draw(screen_points):
+            indices = []
+            triangles = []
+
+            # for i in range(stack_count):
+            #     k1 = i * (sector_count + 1);
+            #     k2 = k1 + sector_count + 1;
 
-        # for i in range(stack_count):
-        #     k1 = i * (sector_count + 1);
-        #     k2 = k1 + sector_count + 1;
+            #     for j in range(sector_count):
+            #         if i != 0:
+            #             indices += [k1, k1 + 1, k2]
 
-        #     for j in range(sector_count):
-        #         if i != 0:
-        #             indices += [k1, k1 + 1, k2]
+            #         if i != (stack_count - 1):
+            #             indices += [k1 + 1, k2 + 1, k2]
+                    
+            #         k1 += 1
+            #         k2 += 1
 
-        #         if i != (stack_count - 1):
-        #             indices += [k1 + 1, k2 + 1, k2]
-                
-        #         k1 += 1
-        #         k2 += 1
+            # for i in screen_points:
+            #     print([int(i[0][0, 0]), int(i[1][0, 0])])
+            #     gpu.GPU.draw_pixels([int(i[0][0, 0]), int(i[1][0, 0])], gpu.GPU.RGB8, [255, 255, 255])
 
-        # for i in screen_points:
-        #     print([int(i[0][0, 0]), int(i[1][0, 0])])
-        #     gpu.GPU.draw_pixels([int(i[0][0, 0]), int(i[1][0, 0])], gpu.GPU.RGB8, [255, 255, 255])
+            # return
 
-        # return
+            for i in range(stack_count):
+                k1 = i * (sector_count + 1)
+                k2 = k1 + sector_count + 1
 
-        for i in range(stack_count):
-            k1 = i * (sector_count + 1)
-            k2 = k1 + sector_count + 1
+                for j in range(sector_count):
+                    if (k1 + 1 >= len(screen_points) or k2 + 1 >= len(screen_points)): break
+                    if i != 0:
+                        triangles += [[screen_points[k1], screen_points[k1 + 1], screen_points[k2]]]
 
-            for j in range(sector_count):
-                if (k1 + 1 >= len(screen_points) or k2 + 1 >= len(screen_points)): break
-                if i != 0:
-                    triangles += [[screen_points[k1], screen_points[k1 + 1], screen_points[k2]]]
+                    if i != (stack_count - 1):
+                        triangles += [[screen_points[k1 + 1], screen_points[k2 + 1], screen_points[k2]]]
+                    
+                    k1 += 1
+                    k2 += 1
 
-                if i != (stack_count - 1):
-                    triangles += [[screen_points[k1 + 1], screen_points[k2 + 1], screen_points[k2]]]
-                
-                k1 += 1
-                k2 += 1
+            # print(indices, len(screen_points))
+            utils.Rasterizer.render(triangles=triangles, colors=colors)
 
-        # print(indices, len(screen_points))
-        utils.Rasterizer.render(triangles=triangles, colors=colors)
+        ## Transformations
+        GL.submit(point, draw, colors)
 
     @staticmethod
     def navigationInfo(headlight):
@@ -403,7 +604,7 @@ class GL:
         utils.Light.setup(ambient_intensity=ambientIntensity, color=color, intensity=intensity, direction=direction)
 
     @staticmethod
-    def timeSensor(cycleInterval, loop):
+    def timeSensor(cycleInterval, loop, timestamp=None):
         """Gera eventos conforme o tempo passa."""
         # Os nós TimeSensor podem ser usados para muitas finalidades, incluindo:
         # Condução de simulações e animações contínuas; Controlar atividades periódicas;
@@ -413,14 +614,16 @@ class GL:
         # tempo continua a execução no próximo ciclo. O ciclo de um nó TimeSensor dura
         # cycleInterval segundos. O valor de cycleInterval deve ser maior que zero.
 
-        # Deve retornar a fração de tempo passada em fraction_changed
+        # Deve retornar a fração de tempo passada em fraction_changed. O instante vem em
+        # timestamp quando o relógio é simulado (ver Renderizador.clock), assim um quadro
+        # depende só do seu instante; sem ele é usado o relógio do sistema.
 
         # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
         # print("TimeSensor : cycleInterval = {0}".format(cycleInterval)) # imprime no terminal
         # print("TimeSensor : loop = {0}".format(loop))
     
         # Esse método já está implementado para os alunos como exemplo
-        epoch = time.time()  # time in seconds since the epoch as a floating point number.
+        epoch = time.time() if timestamp is None else timestamp  # time in seconds since the epoch as a floating point number.
         fraction_changed = (epoch % cycleInterval) / cycleInterval
 
         return fraction_changed
@@ -435,6 +638,7 @@ class GL:
         # quadros-chave no key. O campo closed especifica se o interpolador deve tratar a malha
         # como fechada, com uma transições da última chave para a primeira chave. Se os keyValues
         # na primeira e na última chave não forem idênticos, o campo closed será ignorado.
+        # Se set_fraction for um array de frações retorna um array com um valor por linha.
 
         # print("SplinePositionInterpolator : set_fraction = {0}".format(set_fraction))
         # print("SplinePositionInterpolator : key = {0}".format(key)) # imprime no terminal
@@ -456,6 +660,7 @@ class GL:
         # dos valores em keyValue, a fração a ser interpolada vem de set_fraction que varia de
         # zeroa a um. O campo keyValue deve conter exatamente tantas rotações 3D quanto os
         # quadros-chave no key.
+        # Se set_fraction for um array de frações retorna um array com um valor por linha.
 
         # print("OrientationInterpolator : set_fraction = {0}".format(set_fraction))
         # print("OrientationInterpolator : key = {0}".format(key)) # imprime no terminal
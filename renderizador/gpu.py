@@ -10,6 +10,7 @@ Data: 31 de Agosto de 2020
 """
 
 import os           # Para rotinas do sistema operacional
+import atexit       # Termina as gravações pendentes ao sair
 
 # Numpy
 import numpy as np
@@ -17,6 +18,8 @@ import numpy as np
 # Pillow
 from PIL import Image
 
+import saida        # Grava as imagens em sequências numeradas ou vídeo
+
 class FrameBuffer:
     """Organiza objetos FrameBuffer (FrameBuffer Objects)."""
 
@@ -46,15 +49,21 @@ class GPU:
     width = 60     # Legado, deverá ser REMOVIDO
     height = 40    # Legado, deverá ser REMOVIDO
     image_file = None
+    writer = None  # escritor das imagens salvas (ver saida.writer)
+    sink = None    # gravação em segundo plano do save_image, None grava na hora
     frame_buffer = None
+    swap_chain = []  # framebuffers que se alternam no swap_buffers (ver bind_swap_chain)
     path = "."
+    textures = {}  # texturas já lidas, compartilhadas por todas as instâncias que as usam
 
     def __init__(self, image_file, path):
         """Define o nome do arquivo para caso se salvar o framebuffer."""
         GPU.image_file = image_file
+        GPU.writer = saida.writer(image_file)
 
         # Inicia lista para objetos Frame Buffer
         GPU.frame_buffer = []
+        GPU.swap_chain = []
 
         # Define buffers de leitura e escrita
         GPU.draw_framebuffer = 0
@@ -88,6 +97,14 @@ class GPU:
             GPU.draw_framebuffer = position
             GPU.read_framebuffer = position
 
+    @staticmethod
+    def bind_swap_chain(positions):
+        """Define os FrameBuffers alternados pelo swap_buffers (FRONT, BACK, ...)."""
+        # O primeiro passa a ser o de leitura (exibido e salvo) e o segundo o de desenho.
+        GPU.swap_chain = list(positions)
+        GPU.read_framebuffer = GPU.swap_chain[0]
+        GPU.draw_framebuffer = GPU.swap_chain[1 % len(GPU.swap_chain)]
+
     @staticmethod
     def framebuffer_storage(position, attachment, mode, width, height):
         """Aloca o FrameBuffer especificado."""
@@ -125,8 +142,35 @@ class GPU:
         """Usa o mesmo valor em todo o FrameBuffer, na prática apagando ele."""
         if GPU.frame_buffer[GPU.draw_framebuffer].color.size != 0:
             GPU.frame_buffer[GPU.draw_framebuffer].color[:] = GPU.clear_color_val
-        if GPU.frame_buffer[GPU.draw_framebuffer].depth.size != 0:
-            GPU.frame_buffer[GPU.draw_framebuffer].depth[:] = GPU.clear_depth_val
+        depth = GPU.frame_buffer[GPU.draw_framebuffer].depth
+        if depth.size != 0:
+            depth[:] = GPU.depth_value(GPU.clear_depth_val, GPU.depth_mode(depth))
+
+    # Profundidades vão de -1.0 (a mais próxima) a 1.0 (a mais afastada), como o z normalizado
+    # dos vértices. DEPTH_COMPONENT32F guarda a profundidade menos 1 em float, de -2.0 a 0.0:
+    # a maior parte da cena fica com z normalizado perto de 1.0, onde o float de 32 bits quase
+    # não distingue valores, e perto de 0.0 ele tem toda a precisão (como o reversed-Z das
+    # GPUs). DEPTH_COMPONENT16 guarda inteiros de 0 (-1.0) a 65535 (1.0). Nos dois o teste de
+    # profundidade aceita os valores menores.
+
+    @staticmethod
+    def depth_mode(depth):
+        """Modo (DEPTH_COMPONENT16 ou DEPTH_COMPONENT32F) de um array de profundidades."""
+        return GPU.DEPTH_COMPONENT16 if depth.dtype == np.uint16 else GPU.DEPTH_COMPONENT32F
+
+    @staticmethod
+    def depth_value(depth, mode):
+        """Valor guardado no buffer do modo dado para uma profundidade de -1.0 a 1.0."""
+        if mode == GPU.DEPTH_COMPONENT16:
+            return np.clip(np.rint((np.asarray(depth, dtype=np.float64) + 1) * 32767.5), 0, 65535)
+        return np.asarray(depth, dtype=np.float64) - 1
+
+    @staticmethod
+    def depth_from_value(value, mode):
+        """Profundidade de -1.0 a 1.0 de um valor guardado no buffer do modo dado."""
+        if mode == GPU.DEPTH_COMPONENT16:
+            return np.asarray(value, dtype=np.float64) / 32767.5 - 1
+        return np.asarray(value, dtype=np.float64) + 1
 
     # Obsoleto, parar de usar no futuro
     @staticmethod
@@ -162,32 +206,122 @@ class GPU:
             data = GPU.frame_buffer[GPU.read_framebuffer].depth[coord[1]][coord[0]]
         return data
 
+    # Acesso em bloco: as regiões são (min_x, min_y, max_x, max_y) com o máximo exclusivo,
+    # como os retângulos do Rasterizer, e as leituras devolvem views (sem cópia) do buffer.
+    # Os dados escritos podem ser um array do tamanho da região ou um valor só (ex.: uma cor).
+
+    @staticmethod
+    def attachment(position, mode):
+        """Array de cores ou de profundidade do FrameBuffer, conforme o modo."""
+        if mode in (GPU.DEPTH_COMPONENT16, GPU.DEPTH_COMPONENT32F):  # profundidade
+            return GPU.frame_buffer[position].depth
+        return GPU.frame_buffer[position].color  # cores
+
+    @staticmethod
+    def draw_region(region, mode, data):
+        """Define os valores de uma região retangular do framebuffer."""
+        min_x, min_y, max_x, max_y = region
+        GPU.attachment(GPU.draw_framebuffer, mode)[min_y:max_y, min_x:max_x] = data
+
+    @staticmethod
+    def read_region(region, mode):
+        """Retorna uma view de uma região retangular do framebuffer."""
+        min_x, min_y, max_x, max_y = region
+        return GPU.attachment(GPU.read_framebuffer, mode)[min_y:max_y, min_x:max_x]
+
+    @staticmethod
+    def draw_span(min_x, max_x, y, mode, data):
+        """Define os valores de um trecho horizontal (linha y, de min_x até max_x)."""
+        GPU.attachment(GPU.draw_framebuffer, mode)[y, min_x:max_x] = data
+
     @staticmethod
-    def save_image():
+    def read_span(min_x, max_x, y, mode):
+        """Retorna uma view de um trecho horizontal do framebuffer."""
+        return GPU.attachment(GPU.read_framebuffer, mode)[y, min_x:max_x]
+
+    @staticmethod
+    def draw_masked(mask, mode, data):
+        """Define os valores dos pixels escolhidos por mask."""
+        # mask é uma máscara booleana (altura, largura) ou um par de arrays (v, u) com as
+        # coordenadas; data tem um valor por pixel escolhido, na mesma ordem, ou um só.
+        GPU.attachment(GPU.draw_framebuffer, mode)[mask] = data
+
+    @staticmethod
+    def read_masked(mask, mode):
+        """Retorna os valores dos pixels escolhidos por mask (uma cópia, não há view)."""
+        return GPU.attachment(GPU.read_framebuffer, mode)[mask]
+
+    @staticmethod
+    def save_image(frame=None):
         """Método para salvar a imagem do framebuffer em um arquivo."""
-        if GPU.frame_buffer[GPU.read_framebuffer].color.shape[2] == 3:
-            img = Image.fromarray(GPU.frame_buffer[GPU.read_framebuffer].color, 'RGB')
-        else:
-            img = Image.fromarray(GPU.frame_buffer[GPU.read_framebuffer].color, 'RGBA')
-        counter = 0
-        filename = GPU.image_file.split('.')
-        while os.path.exists(filename[0]+str(counter).zfill(3)+'.'+filename[1]):
-            counter += 1
-        img.save(filename[0]+str(counter).zfill(3)+'.'+filename[1])
+        # Um quadro de animação é numerado pelo próprio quadro, uma imagem avulsa pelo
+        # próximo número livre (o escritor guarda o contador, ver saida.SequenceWriter).
+        if GPU.sink is not None:  # copia o framebuffer e segue, a gravação fica com as threads
+            return GPU.sink.submit(GPU.frame_buffer[GPU.read_framebuffer].color, frame)
+        return GPU.writer.write(GPU.frame_buffer[GPU.read_framebuffer].color, frame)
+
+    @staticmethod
+    def set_saving(threads=0, level=None, sizes=None, fps=30):
+        """Define como o save_image grava: em segundo plano com threads > 0, compressão do PNG,
+        tamanhos reduzidos gravados junto (ver saida.PyramidWriter) e quadros por segundo de
+        um vídeo .y4m."""
+        GPU.flush()
+        GPU.writer = saida.writer(GPU.image_file, fps, level, sizes)
+        if threads > 0:
+            GPU.sink = saida.FrameSink(GPU.writer, threads)
+
+    @staticmethod
+    def flush():
+        """Espera as imagens enviadas ao save_image serem gravadas."""
+        if GPU.sink is not None:
+            sink, GPU.sink = GPU.sink, None
+            sink.close()
+
+    @staticmethod
+    def frame_file(frame):
+        """Nome do arquivo em que save_image grava um quadro de uma animação."""
+        return GPU.writer.filename(frame)
 
     @staticmethod
     def load_texture(textura):
         """Método para ler textura."""
         file = os.path.join(GPU.path, textura)
-        imagem = Image.open(file)
-        matriz = np.array(imagem)
-        return matriz
+        if file not in GPU.textures:
+            imagem = Image.open(file)
+            GPU.textures[file] = np.array(imagem)
+        return GPU.textures[file]
 
     @staticmethod
     def get_frame_buffer():
         """Retorna o Framebuffer atual para leitura."""
         return GPU.frame_buffer[GPU.read_framebuffer].color
 
+    @staticmethod
+    def get_draw_buffer():
+        """Retorna o Framebuffer atual para desenho."""
+        return GPU.frame_buffer[GPU.draw_framebuffer].color
+
+    @staticmethod
+    def get_depth_buffer():
+        """Retorna as profundidades do Framebuffer atual para leitura (vazio se não alocadas)."""
+        return GPU.frame_buffer[GPU.read_framebuffer].depth
+
+    @staticmethod
+    def get_draw_depth_buffer():
+        """Retorna as profundidades do Framebuffer atual para desenho (vazio se não alocadas)."""
+        return GPU.frame_buffer[GPU.draw_framebuffer].depth
+
     @staticmethod
     def swap_buffers():
-        """Método para a troca dos buffers (NÃO IMPLEMENTADA)."""
+        """Método para a troca dos buffers."""
+        # O buffer recém desenhado passa a ser o de leitura e o próximo da cadeia passa a
+        # receber o desenho. Com dois buffers eles só trocam de papel; com três o quadro
+        # anterior ao exibido ainda fica intacto um quadro a mais (ex.: sendo gravado).
+        if len(GPU.swap_chain) < 2:
+            return  # um só buffer, desenho e leitura no mesmo
+        drawn = GPU.swap_chain.index(GPU.draw_framebuffer)
+        GPU.read_framebuffer = GPU.draw_framebuffer
+        GPU.draw_framebuffer = GPU.swap_chain[(drawn + 1) % len(GPU.swap_chain)]
+
+
+atexit.register(GPU.flush)  # uma vez só; não faz nada se não houver gravação em segundo plano
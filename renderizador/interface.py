@@ -25,6 +25,8 @@ class Interface:
     poligonos = []     # poligonos a serem desenhados
 
     last_time = 0      # para calculo de FPS
+    skipped = 0        # quadros não renderizados por a cena estar parada
+    idle_interval = 100  # intervalo (ms) entre quadros enquanto a cena está parada
 
     def __init__(self, width, height):
         """Inicializa Interface Gráfica."""
@@ -144,7 +146,7 @@ class Interface:
             print("Salvando imagem")
             self.image_saver()
 
-    def preview(self, pause, func):
+    def preview(self, pause, func, idle=None):
         """Realização a visualização na tela da interface gráfica."""
         extent = (0, self.width, self.height, 0)
 
@@ -181,6 +183,16 @@ class Interface:
         # Animação de quadros
         def animate(_frame_number):
 
+            # Se a cena está parada (função idle) o quadro anterior continua valendo, então
+            # não renderiza, mostra os quadros pulados e espaça os próximos quadros
+            if idle is not None and idle():
+                Interface.skipped += 1
+                time_box.set_val("ocioso ({0})".format(Interface.skipped))
+                anim.event_source.interval = Interface.idle_interval
+                Interface.last_time = time.process_time()
+                return image, time_box
+            anim.event_source.interval = 1
+
             # Executa a função recebida como parâmetro no método principal
             data = func()
 
@@ -204,6 +216,6 @@ class Interface:
             time_box = TextBox(time_box_pos, 'Tempo (s) ', initial="{:.4f}".format(elapsed_time))
         else:
             time_box = TextBox(time_box_pos, 'FPS ', initial="0.0")
-            _ = animation.FuncAnimation(self.fig, animate, interval=1, blit=False)
+            anim = animation.FuncAnimation(self.fig, animate, interval=1, blit=False)
 
         plt.show()
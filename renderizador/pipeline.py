@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Renderização de quadros em estágios que rodam ao mesmo tempo.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import queue        # Filas limitadas entre os estágios
+import threading    # Estágio de raster em outra thread
+
+import gl           # Etapas de vértices e de raster da biblioteca gráfica
+import gpu          # Simula os recursos de uma GPU
+import utils        # Light, Rasterizer e RenderProcesses
+
+# Um quadro passa por três estágios:
+#   1. traversal do grafo de cena e etapa de vértices (GL.transform_instances), nessa thread;
+#   2. raster dos desenhos e resolução das subamostras (GL.raster, Rasterizer.sample), na
+#      thread do Pipeline, que depois troca os buffers da GPU;
+#   3. codificação e gravação, nas threads do FrameSink de quem recebe os quadros.
+# Enquanto o quadro N é rasterizado o traversal do N + 1 já acontece, e o N - 1 está sendo
+# gravado. Entre os estágios 1 e 2 a fila é limitada (depth quadros), então o traversal
+# espera se o raster ficar para trás. Tudo que o raster lê do quadro vai junto com os
+# desenhos: a luz (Light.snapshot) e as rotinas 2D antigas, que desenham direto na GPU e por
+# isso são guardadas no traversal (GL.direct) e executadas no estágio 2.
+#
+# Os estágios são threads, e o raster (Python puro) segura o GIL quase o tempo todo: o
+# traversal só anda junto nas partes em NumPy. Por isso, enquanto o raster não liberar o
+# GIL, o pipeline rende o mesmo que a renderização sequencial (às vezes um pouco menos,
+# pelas filas e trocas de thread); a estrutura fica pronta para quando liberar.
+
+
+class Pipeline:
+    """Renderiza uma sequência de quadros com traversal, raster e gravação sobrepostos."""
+
+    def __init__(self, renderer, depth=2):
+        """Prepara os estágios para a cena já carregada em renderer."""
+        self.renderer = renderer
+        self.depth = depth
+
+    @staticmethod
+    def supported():
+        """Se os desenhos são adiados até o fim do traversal, o que o pipeline precisa."""
+        return gl.GL.instancing or utils.Rasterizer.incremental
+
+    def frames(self, work):
+        """Renderiza os (quadro, instante) de work e devolve (quadro, instante, imagem) em ordem."""
+        rasters = queue.Queue(self.depth)
+        done = queue.Queue()  # no máximo depth + 1 quadros, esvaziada a cada traversal
+        thread = threading.Thread(target=self.raster, args=(rasters, done), daemon=True)
+
+        thread.start()
+        try:
+            pending = 0
+            for frame, timestamp in work:
+                rasters.put(self.traverse(frame, timestamp))
+                pending += 1
+                while not done.empty():
+                    pending -= 1
+                    yield Pipeline.result(done.get())
+            rasters.put(None)
+            for _ in range(pending):
+                yield Pipeline.result(done.get())
+        finally:
+            rasters.put(None)  # se quem recebe parou antes, termina o raster mesmo assim
+            thread.join()
+            gl.GL.direct = None
+
+    def traverse(self, frame, timestamp):
+        """Estágio 1: traversal e vértices do quadro, devolve o que o raster precisa."""
+        print("\n++++++++ Started traversal of frame %d ++++++++" % frame)
+        gl.GL.direct = []
+        utils.RenderProcesses.run_pre_render()
+        self.renderer.scene.render(timestamp)
+        draws = gl.GL.transform_instances()
+        return frame, timestamp, draws, utils.Light.snapshot(), gl.GL.direct
+
+    def raster(self, rasters, done):
+        """Estágio 2: rasteriza e resolve os quadros na ordem em que chegam."""
+        failed = False
+        while True:
+            item = rasters.get()
+            if item is None:
+                return
+            if failed:
+                continue  # só esvazia a fila, para o traversal não ficar esperando
+            try:
+                frame, timestamp, draws, light, direct = item
+                gpu.GPU.clear_buffer()
+                for routine, args, kwargs in direct:
+                    routine(*args, **kwargs)
+                gl.GL.raster(draws, light)
+                utils.Rasterizer.sample()
+                gpu.GPU.swap_buffers()
+                self.renderer.save_auxiliary(frame)  # antes que o próximo raster use os planos
+                # cópia: o buffer lido volta a ser desenhado antes de o quadro ser gravado
+                done.put((frame, timestamp, gpu.GPU.get_frame_buffer().copy()))
+            except Exception as error:
+                done.put(error)
+                failed = True
+
+    @staticmethod
+    def result(item):
+        if isinstance(item, Exception):
+            raise RuntimeError("Could not raster frame: %s" % item) from item
+        return item
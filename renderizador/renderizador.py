@@ -18,6 +18,9 @@ import interface    # Janela de visualização baseada no Matplotlib
 import gpu
 
 import x3d          # Faz a leitura do arquivo X3D, gera o grafo de cena e faz traversal
+import cache        # Cache binário das cenas X3D já lidas
+import animacao     # Renderização de animações em quadros, em paralelo
+import saida        # Gravação dos planos auxiliares (profundidade, ids, posições)
 
 # Deprecated
 import rotinas      # Desatualizado possui rotinas antigas de suporte ao X3D (legado)
@@ -27,6 +30,25 @@ import time
 LARGURA = 60  # Valor padrão para largura da tela
 ALTURA = 40   # Valor padrão para altura da tela
 
+class Clock:
+    """Relógio simulado com passo fixo, o quadro n acontece em start + n / fps."""
+
+    def __init__(self, fps, start=0.0):
+        """Define a taxa de quadros e o instante do primeiro quadro."""
+        self.fps = fps
+        self.start = start
+        self.frame = 0  # próximo quadro quando usado como relógio do laço de renderização
+
+    def time(self, frame):
+        """Instante (s) de um quadro qualquer."""
+        return self.start + frame / self.fps
+
+    def __call__(self):
+        """Instante do próximo quadro, avança o relógio em um passo."""
+        timestamp = self.time(self.frame)
+        self.frame += 1
+        return timestamp
+
 class Renderizador:
     """Realiza a renderização da cena informada."""
 
@@ -38,32 +60,35 @@ class Renderizador:
         self.image_file = "tela.png"
         self.scene = None
         self.framebuffers = {}
+        self.buffers = 2  # 1 só FRONT, 2 FRONT e BACK (double buffering), 3 triple buffering
+        self.depth_format = gpu.GPU.DEPTH_COMPONENT32F  # profundidades do teste de profundidade
+        self.auxiliary = None  # grava os planos auxiliares junto com as imagens (set_auxiliary)
+        self.window = None  # (x, y, largura, altura) da imagem que é renderizada, None é toda
+        self.clock = None  # função que dá o instante de cada quadro, None usa o do sistema
 
     def setup(self):
         """Configura o sistema para a renderização."""
         # Configurando color buffers para exibição na tela
 
-        # Cria uma (1) posição de FrameBuffer na GPU
-        fbo = gpu.GPU.gen_framebuffers(1)
+        # Cria as posições de FrameBuffer na GPU (FRONT e os BACK)
+        fbo = gpu.GPU.gen_framebuffers(self.buffers)
 
-        # Define o atributo FRONT como o FrameBuffe principal
+        # Define o atributo FRONT como o FrameBuffe principal, o exibido, e BACK (BACK2 no
+        # triple buffering) como os que recebem o desenho dos próximos quadros
         self.framebuffers["FRONT"] = fbo[0]
+        for i, position in enumerate(fbo[1:]):
+            self.framebuffers["BACK" + (str(i + 1) if i else "")] = position
 
-        # Define que a posição criada será usada para desenho e leitura
-        gpu.GPU.bind_framebuffer(gpu.GPU.FRAMEBUFFER, self.framebuffers["FRONT"])
-        # Opções:
+        # Define que o FRONT será usado para leitura e o BACK para desenho, alternando a
+        # cada swap_buffers (com um só buffer ele é usado para desenho e leitura)
+        gpu.GPU.bind_swap_chain(fbo)
+        # Opções de bind_framebuffer para escolher um framebuffer diretamente:
         # - DRAW_FRAMEBUFFER: Faz o bind só para escrever no framebuffer
         # - READ_FRAMEBUFFER: Faz o bind só para leitura no framebuffer
         # - FRAMEBUFFER: Faz o bind para leitura e escrita no framebuffer
 
-        # Aloca memória no FrameBuffer para um tipo e tamanho especificado de buffer
-        gpu.GPU.framebuffer_storage(
-            self.framebuffers["FRONT"],
-            gpu.GPU.COLOR_ATTACHMENT,
-            gpu.GPU.RGB8,
-            self.width,
-            self.height
-        )
+        # Aloca memória nos FrameBuffers para um tipo e tamanho especificado de buffer
+        self.storage()
         # Opções:
         # - COLOR_ATTACHMENT: alocações para as cores da imagem renderizada
         # - DEPTH_ATTACHMENT: alocações para as profundidades da imagem renderizada
@@ -85,6 +110,54 @@ class Renderizador:
         # Definindo tamanho do Viewport para renderização
         self.scene.viewport(width=self.width, height=self.height)
 
+    def storage(self):
+        """Aloca as cores e profundidades dos FrameBuffers com o tamanho renderizado."""
+        width, height = self.frame_size()
+        for position in self.framebuffers.values():
+            gpu.GPU.framebuffer_storage(
+                position,
+                gpu.GPU.COLOR_ATTACHMENT,
+                gpu.GPU.RGB8,
+                width,
+                height
+            )
+            # Profundidades para o teste de profundidade do raster, uma por subamostra
+            gpu.GPU.framebuffer_storage(
+                position,
+                gpu.GPU.DEPTH_ATTACHMENT,
+                self.depth_format,
+                width * gl.GL.sampling_X_,
+                height * gl.GL.sampling_X_
+            )
+
+    def frame_size(self):
+        """Largura e altura da imagem renderizada: a da janela (self.window), se houver."""
+        return self.window[2:] if self.window else (self.width, self.height)
+
+    def set_window(self, x, y, width, height):
+        """Passa a renderizar só a janela (x, y, largura, altura) da imagem, em pixels."""
+        # Pixels iguais aos da imagem inteira, com buffers (e memória) do tamanho da janela
+        self.window = (x, y, width, height)
+        self.storage()
+        gl.GL.set_window(x, y, width, height)
+
+    def render_strips(self, band, level=None):
+        """Renderiza a imagem em faixas de band linhas, gravadas uma de cada vez."""
+        # Só uma faixa fica na memória (buffers da GPU e subamostras do Rasterizer), então
+        # imagens enormes cabem na memória; as linhas vão direto para o arquivo.
+        filename = gpu.GPU.writer.name()
+        stream = saida.StreamWriter(filename, self.width, self.height, level)
+        # O mesmo instante em todas as faixas, mesmo com o relógio do sistema
+        timestamp = self.clock() if self.clock is not None else time.time()
+        try:
+            for y in range(0, self.height, band):
+                self.set_window(0, y, self.width, min(band, self.height - y))
+                stream.write(self.render(timestamp))
+                print("Strip %d/%d" % (y // band + 1, -(-self.height // band)), flush=True)
+        finally:
+            stream.close()
+        return filename
+
     def pre(self):
         """Rotinas pré renderização."""
         # Função invocada antes do processo de renderização iniciar.
@@ -102,15 +175,16 @@ class Renderizador:
         # Função invocada após o processo de renderização terminar.
         utils.RenderProcesses.run_post_render()
 
-        # Método para a troca dos buffers (NÃO IMPLEMENTADO)
+        # Troca os buffers: o quadro desenhado passa a ser o exibido
         gpu.GPU.swap_buffers()
 
     def mapping(self):
         """Mapeamento de funções para as rotinas de renderização."""
         # Rotinas antigas ainda no arquivo rotinas.py
-        x3d.X3D.renderer["Polypoint2D"] = rotinas.polypoint2D
-        x3d.X3D.renderer["Polyline2D"] = rotinas.polyline2D
-        x3d.X3D.renderer["TriangleSet2D"] = rotinas.triangleSet2D
+        # (desenham direto na GPU, por isso passam por GL.gpu_routine)
+        x3d.X3D.renderer["Polypoint2D"] = gl.GL.gpu_routine(rotinas.polypoint2D)
+        x3d.X3D.renderer["Polyline2D"] = gl.GL.gpu_routine(rotinas.polyline2D)
+        x3d.X3D.renderer["TriangleSet2D"] = gl.GL.gpu_routine(rotinas.triangleSet2D)
         # Rotinas encapsuladas na classe GL (Graphics Library)
         x3d.X3D.renderer["TriangleSet"] = gl.GL.triangleSet
         x3d.X3D.renderer["Viewpoint"] = gl.GL.viewpoint
@@ -129,18 +203,80 @@ class Renderizador:
         x3d.X3D.renderer["SplinePositionInterpolator"] = gl.GL.splinePositionInterpolator
         x3d.X3D.renderer["OrientationInterpolator"] = gl.GL.orientationInterpolator
 
-    def render(self):
+    def render(self, timestamp=None):
         """Laço principal de renderização."""
+        # O quadro é o da cena no instante timestamp; sem ele o instante vem do relógio
+        # (self.clock), e se não houver relógio os TimeSensors usam a hora do sistema.
+        if timestamp is None and self.clock is not None:
+            timestamp = self.clock()
+
         print("\n++++++++ Started rendering frame ++++++++")
         start_time_render = time.time()
         self.pre()  # executa rotina pré renderização
-        self.scene.render()  # faz o traversal no grafo de cena
+        self.scene.render(timestamp)  # faz o traversal no grafo de cena
         self.pos()  # executa rotina pós renderização
         print("+++ Time to render frame: %s seconds +++" % (time.time() - start_time_render))
         print("+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++\n")
 
         return gpu.GPU.get_frame_buffer()
 
+    def set_auxiliary(self, positions=False):
+        """Passa a guardar profundidade, id dos objetos e, se pedido, posições no mundo."""
+        self.auxiliary = saida.AuxiliaryWriter(self.image_file, positions)
+        utils.Rasterizer.set_auxiliary(positions)
+
+    def save_auxiliary(self, frame=None):
+        """Grava os planos auxiliares do quadro exibido, devolve os arquivos (None sem eles)."""
+        # Deve ser chamado antes do raster do próximo quadro, que reaproveita os planos
+        if self.auxiliary is None:
+            return None
+        names = self.scene.commands.object_ids if self.scene.commands is not None else None
+        width, height = self.frame_size()
+        return self.auxiliary.write(utils.Rasterizer.resolve_auxiliary, (height, width), frame, names)
+
+    def save(self):
+        """Salva a imagem exibida e os seus planos auxiliares."""
+        gpu.GPU.save_image()
+        self.save_auxiliary()
+
+    def load(self, no_cache=False, window=None, sampling=None):
+        """Prepara a GPU, a biblioteca gráfica e a cena para renderizar."""
+        path = os.path.dirname(os.path.abspath(self.x3d_file))
+
+        # Iniciando simulação de GPU
+        gpu.GPU(self.image_file, path)
+
+        # Abre arquivo X3D
+        self.scene = x3d.X3D(self.x3d_file)
+
+        # Iniciando Biblioteca Gráfica
+        gl.GL.setup(
+            self.width,
+            self.height,
+            near=0.01,
+            far=1000,
+            sampling=sampling,
+            window=self.window
+        )
+
+        # Funções que irão fazer o rendering
+        self.mapping()
+
+        # Janela de visualização (não existe no modo silencioso)
+        if window is not None:
+            self.scene.set_preview(window)
+
+        # carrega os dados do grafo de cena (do cache compilado se ainda for válido)
+        if self.scene:
+            if no_cache or not cache.load(self.scene):
+                self.scene.parse()
+                if not no_cache:
+                    cache.save(self.scene)
+
+        # Configura o sistema para a renderização.
+        self.setup()
+        utils.RenderProcesses.setup(self.scene)
+
     def main(self):
         """Executa a renderização."""
         # Tratando entrada de parâmetro
@@ -151,6 +287,35 @@ class Renderizador:
         parser.add_argument("-h", "--height", help="resolução vertical", type=int)
         parser.add_argument("-p", "--pause", help="começa simulação em pausa", action='store_true')
         parser.add_argument("-q", "--quiet", help="não exibe janela", action='store_true')
+        parser.add_argument("--no-cache", help="não usa o cache da cena compilada",
+                            action='store_true')
+        parser.add_argument("--fps", help="quadros por segundo do relógio simulado (padrão 30 com --frames)",
+                            type=float)
+        parser.add_argument("--start", help="instante (s) do primeiro quadro", type=float,
+                            default=0.0)
+        parser.add_argument("--frames", help="quantidade de quadros a salvar (com -q)", type=int)
+        parser.add_argument("--jobs", help="processos que renderizam os quadros (com --frames), 0 usa todos os núcleos",
+                            type=int, default=1)
+        parser.add_argument("--buffers", help="framebuffers alternados a cada quadro: 1, 2 (double) ou 3 (triple buffering)",
+                            type=int, choices=(1, 2, 3), default=2)
+        parser.add_argument("--depth", help="bits das profundidades: 16 (inteiros) ou 32 (float, padrão)",
+                            type=int, choices=(16, 32), default=32)
+        parser.add_argument("--aux", help="grava também profundidade e ids dos objetos (DEF) em .npy",
+                            action='store_true')
+        parser.add_argument("--positions", help="com --aux, grava também as posições no mundo",
+                            action='store_true')
+        parser.add_argument("--strip", help="com -q, renderiza a imagem em faixas dessa altura (memória proporcional a ela)",
+                            type=int)
+        parser.add_argument("--crop", help="renderiza só o retângulo X,Y,LARGURA,ALTURA da imagem, com os mesmos pixels",
+                            type=lambda text: tuple(int(v) for v in text.split(",")))
+        parser.add_argument("--sizes", help="grava também a imagem reduzida (média de área) a esses tamanhos, como 640x360,320 (só a largura mantém a proporção)",
+                            type=lambda text: [tuple(int(v) for v in size.split("x")) for size in text.split(",")])
+        parser.add_argument("--pipeline", help="com --frames, faz o traversal de um quadro durante o raster do anterior",
+                            action='store_true')
+        parser.add_argument("--writers", help="threads que gravam as imagens em segundo plano, 0 grava na hora",
+                            type=int, default=2)
+        parser.add_argument("--png-level", help="compressão zlib do PNG, de 0 (nenhuma) a 9",
+                            type=int, choices=range(10))
         args = parser.parse_args() # parse the arguments
         if args.input:
             self.x3d_file = args.input
@@ -160,48 +325,56 @@ class Renderizador:
             self.width = args.width
         if args.height:
             self.height = args.height
+        if args.fps:
+            self.clock = Clock(args.fps, args.start)
+        self.buffers = args.buffers
+        if args.crop:
+            x, y, width, height = args.crop
+            if args.strip or x < 0 or y < 0 or width < 1 or height < 1 or x + width > self.width or y + height > self.height:
+                parser.error("--crop must be X,Y,WIDTH,HEIGHT inside the image, without --strip")
+            self.window = args.crop
+        if args.strip:
+            if not args.quiet or args.frames or args.aux or args.positions or args.strip < 1:
+                parser.error("--strip renders a single image: use it with -q, without --frames or --aux")
+            self.window = (0, 0, self.width, min(args.strip, self.height))
+        if args.sizes:
+            width, height = self.frame_size()
+            args.sizes = [size + (None,) if len(size) == 1 else size for size in args.sizes]  # sem altura: proporção
+            for size in args.sizes:
+                if len(size) != 2 or not 1 <= size[0] <= width or not 1 <= (size[1] or 1) <= height:
+                    parser.error("--sizes must be WIDTHxHEIGHT or WIDTH, no larger than the %dx%d image" % (width, height))
+            if args.strip or self.image_file.lower().endswith(".y4m"):
+                parser.error("--sizes writes image sequences: use it without --strip or a .y4m output")
+        if args.depth == 16:
+            self.depth_format = gpu.GPU.DEPTH_COMPONENT16
         
         # self.width = 1270
         # self.height = 720
- 
-        path = os.path.dirname(os.path.abspath(self.x3d_file))
-
-        # Iniciando simulação de GPU
-        gpu.GPU(self.image_file, path)
-
-        # Abre arquivo X3D
-        self.scene = x3d.X3D(self.x3d_file)
-
-        # Iniciando Biblioteca Gráfica
-        gl.GL.setup(
-            self.width,
-            self.height,
-            near=0.01,
-            far=1000
-        )
-
-        # Funções que irão fazer o rendering
-        self.mapping()
 
         # Se no modo silencioso não configurar janela de visualização
+        window = None
         if not args.quiet:
             window = interface.Interface(self.width, self.height)
-            self.scene.set_preview(window)
-
-        # carrega os dados do grafo de cena
-        if self.scene:
-            self.scene.parse()
 
-        # Configura o sistema para a renderização.
-        self.setup()
-        utils.RenderProcesses.setup(self.scene)
+        self.load(args.no_cache, window)
+        if args.aux or args.positions:
+            self.set_auxiliary(args.positions)
+        if not (args.quiet and args.frames):  # animações têm sua gravação (animacao.render)
+            gpu.GPU.set_saving(args.writers, args.png_level, args.sizes, getattr(self.clock, "fps", 30))
 
         # Se no modo silencioso salvar imagem e não mostrar janela de visualização
-        if args.quiet:
-            gpu.GPU.save_image()  # Salva imagem em arquivo
+        if args.quiet and args.frames:
+            clock = self.clock or Clock(30, args.start)
+            animacao.render(self, clock, args.frames, args.jobs, args.no_cache,
+                            args.writers, args.png_level, args.pipeline, args.sizes)
+        elif args.quiet and args.strip:
+            self.render_strips(args.strip, args.png_level)
+        elif args.quiet:
+            self.render()
+            self.save()  # Salva imagem em arquivo
         else:
-            window.set_saver(gpu.GPU.save_image)  # pasa a função para salvar imagens
-            window.preview(args.pause, self.render)  # mostra visualização
+            window.set_saver(self.save)  # pasa a função para salvar imagens
+            window.preview(args.pause, self.render, self.scene.idle)  # mostra visualização
         
 if __name__ == '__main__':
     renderizador = Renderizador()
@@ -12,6 +12,8 @@ Data:
 import gpu          # Simula os recursos de uma GPU
 import math
 
+import numpy as np
+
 #################################################################################
 # NÃO USAR MAIS ESSE ARQUIVO. AS ROTINAS DEVEM SER IMPLEMENTADAS AGORA NO gl.GL #
 #################################################################################
@@ -27,10 +29,17 @@ def polypoint2D(point, colors):
     # O parâmetro colors é um dicionário com os tipos cores possíveis, para o Polypoint2D
     # você pode assumir o desenho dos pontos com a cor emissiva (emissiveColor).
 
-    for p in range(0, len(point) - 1, 2):
-        gpu.GPU.set_pixel(math.floor(point[p]), math.floor(point[p + 1]), colors["emissiveColor"][0] * 255, colors["emissiveColor"][1] * 255, colors["emissiveColor"][2] * 255) # altera um pixel da imagem (u, v, r, g, b)
+    u = [math.floor(point[p]) for p in range(0, len(point) - 1, 2)]
+    v = [math.floor(point[p + 1]) for p in range(0, len(point) - 1, 2)]
+    if u:
+        gpu.GPU.draw_masked((v, u), gpu.GPU.RGB8, emissive(colors)) # altera os pixels da imagem de uma vez
+
+def emissive(colors):
+    """Cor emissiva em valores de 0 a 255 (r, g, b)."""
+    return [colors["emissiveColor"][0] * 255, colors["emissiveColor"][1] * 255, colors["emissiveColor"][2] * 255]
 
 def line(x0, y0, x1, y1, colors):
+    u, v = [], []  # pixels da linha, alterados de uma vez no final
     dx = abs(x1 - x0)
     dy = abs(y1 - y0)
 
@@ -43,7 +52,8 @@ def line(x0, y0, x1, y1, colors):
         err = dx / 2.0
         while x != x1:
     
-            gpu.GPU.set_pixel(x, y, colors["emissiveColor"][0] * 255, colors["emissiveColor"][1] * 255, colors["emissiveColor"][2] * 255) # altera um pixel da imagem (u, v, r, g, b)
+            u.append(x)
+            v.append(y)
 
             err -= dy
             if err < 0:
@@ -54,7 +64,8 @@ def line(x0, y0, x1, y1, colors):
         err = dy / 2.0
         while y != y1:
     
-            gpu.GPU.set_pixel(x, y, colors["emissiveColor"][0] * 255, colors["emissiveColor"][1] * 255, colors["emissiveColor"][2] * 255) # altera um pixel da imagem (u, v, r, g, b)
+            u.append(x)
+            v.append(y)
 
             err -= dx
             if err < 0:
@@ -62,7 +73,9 @@ def line(x0, y0, x1, y1, colors):
                 err += dy
             y += sy     
 
-    gpu.GPU.set_pixel(x, y, colors["emissiveColor"][0] * 255, colors["emissiveColor"][1] * 255, colors["emissiveColor"][2] * 255) # altera um pixel da imagem (u, v, r, g, b)
+    u.append(x)
+    v.append(y)
+    gpu.GPU.draw_masked((v, u), gpu.GPU.RGB8, emissive(colors)) # altera os pixels da imagem (u, v) de uma vez
 
 # web3d.org/documents/specifications/19775-1/V3.0/Part01/components/geometry2D.html#Polyline2D
 def polyline2D(lineSegments, colors):
@@ -103,10 +116,12 @@ def is_inside(triangle, x, y):
     lines = [line1, line2, line3]
     Points = [P1, P2, P3]
 
+    # x e y podem ser arrays de pontos, então o resultado é um array de booleanos
+    inside = True
     for i in range(len(lines)):
-        if not test_point_line(Points[i], (lines[i][1], - lines[i][0])): return False
+        inside = inside & test_point_line(Points[i], (lines[i][1], - lines[i][0]))
 
-    return True
+    return inside
 
 # web3d.org/documents/specifications/19775-1/V3.0/Part01/components/geometry2D.html#TriangleSet2D
 def triangleSet2D(vertices, colors):
@@ -119,12 +134,13 @@ def triangleSet2D(vertices, colors):
     # O parâmetro colors é um dicionário com os tipos cores possíveis, para o TriangleSet2D
     # você pode assumir o desenho das linhas com a cor emissiva (emissiveColor).
 
+    # Testa todos os centros de pixel de uma vez (mesma conta de is_inside, em arrays)
+    x, y = np.meshgrid(np.arange(gpu.GPU.width) + .5, np.arange(gpu.GPU.height) + .5)
     for v in range(0, len(vertices) - 5, 6):
-        for x in range(gpu.GPU.width):
-            for y in range(gpu.GPU.height):
-                triangle = [(vertices[v], vertices[v + 1]), (vertices[v + 2], vertices[v + 3]), (vertices[v + 4], vertices[v + 5])]
-                if (is_inside(triangle, x + .5, y + .5)):
-                    gpu.GPU.set_pixel(x, y, colors["emissiveColor"][0] * 255, colors["emissiveColor"][1] * 255, colors["emissiveColor"][2] * 255) # altera um pixel da imagem (u, v, r, g, b)
+        triangle = [(vertices[v], vertices[v + 1]), (vertices[v + 2], vertices[v + 3]), (vertices[v + 4], vertices[v + 5])]
+        inside = is_inside(triangle, x, y)
+        if inside.any():
+            gpu.GPU.draw_masked(np.nonzero(inside), gpu.GPU.RGB8, emissive(colors)) # altera os pixels da imagem de uma vez
 
 def triangleSet(point, colors):
     """Função usada para renderizar TriangleSet."""
@@ -155,7 +171,7 @@ def viewpoint(position, orientation, fieldOfView):
     print("orientation = {0} ".format(orientation), end='')
     print("fieldOfView = {0} ".format(fieldOfView))
 
-def transform_in(translation, scale, rotation):
+def transform_in(translation, scale, rotation, node=None):
     """Função usada para renderizar (na verdade coletar os dados) de Transform."""
     # A função transform_in será chamada quando se entrar em um nó X3D do tipo Transform
     # do grafo de cena. Os valores passados são a escala em um vetor [x, y, z]
@@ -163,7 +179,8 @@ def transform_in(translation, scale, rotation):
     # coordenadas e finalmente a rotação por [x, y, z, t] sendo definida pela rotação
     # do objeto ao redor do eixo x, y, z por t radianos, seguindo a regra da mão direita.
     # Quando se entrar em um nó transform se deverá salvar a matriz de transformação dos
-    # modelos do mundo em alguma estrutura de pilha.
+    # modelos do mundo em alguma estrutura de pilha. O parâmetro node é o próprio nó
+    # Transform, útil para guardar as matrizes calculadas entre um quadro e outro.
 
     # O print abaixo é só para vocês verificarem o funcionamento, DEVE SER REMOVIDO.
     print("Transform : ", end='')
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Gravação dos quadros renderizados em sequências de imagens ou vídeo.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+import re           # Reconhece os arquivos numerados já existentes
+import json         # Nomes dos ids dos objetos
+import zlib         # Compressão do PNG gravado em faixas
+import struct       # Chunks do PNG gravado em faixas
+import queue        # Fila entre a renderização e a gravação
+import threading    # Gravação em segundo plano
+from fractions import Fraction
+
+# Numpy
+import numpy as np
+
+# Pillow
+from PIL import Image
+
+# Um escritor recebe imagens (altura, largura, 3 ou 4) em uint8 pelo write(imagem, quadro) e
+# devolve o arquivo em que gravou; close() termina a gravação. O write é dividido em name
+# (escolhe o arquivo, na ordem dos envios) e encode (codifica e grava, a parte demorada), para
+# o FrameSink poder escolher os nomes ao receber os quadros e codificá-los em outras threads.
+# Só escritores com parallel verdadeiro aceitam encode de vários quadros ao mesmo tempo.
+
+
+class SequenceWriter:
+    """Sequência de imagens numeradas (PNG, PPM, NPY ou outro formato do Pillow)."""
+
+    # Quadros de animação são nome0000.ext, nome0001.ext, ... (numerados pelo quadro); as
+    # imagens avulsas são nome000.ext, nome001.ext, ... usando o primeiro número livre. Os
+    # números já usados são lidos do diretório uma única vez e o contador fica em memória.
+
+    parallel = True  # cada quadro vai para um arquivo próprio
+
+    def __init__(self, filename, level=None):
+        """Define o nome base, o formato pela extensão e o nível de compressão do PNG."""
+        self.base, self.extension = filename.split('.')[:2]
+        self.level = level  # zlib de 0 (sem compressão) a 9, None usa o padrão do Pillow
+        self.counter = None  # próximo número livre das imagens avulsas, None se não leu ainda
+        self.existing = set()
+
+    def filename(self, frame):
+        """Nome do arquivo de um quadro de animação."""
+        return self.base + str(frame).zfill(4) + '.' + self.extension
+
+    def next_filename(self):
+        """Nome da próxima imagem avulsa, sem sobrescrever as que já existem."""
+        if self.counter is None:
+            self.scan()
+        while self.counter in self.existing:
+            self.counter += 1
+        name = self.base + str(self.counter).zfill(3) + '.' + self.extension
+        self.counter += 1
+        return name
+
+    def scan(self):
+        folder, prefix = os.path.split(self.base)
+        pattern = re.compile(re.escape(prefix) + r"(\d+)\." + re.escape(self.extension) + "$")
+        try:
+            names = os.listdir(folder or ".")
+        except OSError:
+            names = []
+        for name in names:
+            match = pattern.match(name)
+            if match and str(int(match.group(1))).zfill(3) == match.group(1):
+                self.existing.add(int(match.group(1)))
+        self.counter = 0
+
+    def write(self, image, frame=None):
+        """Grava a imagem, como quadro de animação se frame for dado, e devolve o arquivo."""
+        name = self.name(frame)
+        self.encode(image, name)
+        return name
+
+    def name(self, frame=None):
+        """Arquivo do quadro, ou da próxima imagem avulsa se frame for None."""
+        return self.filename(frame) if frame is not None else self.next_filename()
+
+    def encode(self, image, name):
+        """Codifica a imagem no formato da sequência e grava em name."""
+        extension = self.extension.lower()
+        if extension == "npy":
+            np.save(name, image)
+        elif extension == "ppm":  # binário (P6), sem passar pelo Pillow
+            with open(name, "wb") as file:
+                file.write(b"P6\n%d %d\n255\n" % (image.shape[1], image.shape[0]))
+                file.write(np.ascontiguousarray(image[:, :, :3]).tobytes())
+        else:
+            img = Image.fromarray(image, 'RGB' if image.shape[2] == 3 else 'RGBA')
+            if extension == "png" and self.level is not None:
+                img.save(name, compress_level=self.level)
+            else:
+                img.save(name)
+
+    def close(self):
+        pass
+
+
+class Y4MWriter:
+    """Vídeo YUV4MPEG2 (.y4m) sem compressão, gravado quadro a quadro num só arquivo."""
+
+    # Os quadros são acrescentados ao mesmo arquivo (ou pipe, como um FIFO ou o stdin de um
+    # processo de codificação) em YCbCr 4:4:4 de 8 bits, faixa limitada (BT.601), que é o
+    # que os codificadores esperam por padrão. Os quadros são gravados na ordem em que chegam.
+
+    parallel = False  # os quadros precisam entrar no arquivo em ordem
+
+    def __init__(self, output, fps=30):
+        """Define o arquivo (nome ou objeto binário aberto) e a taxa de quadros."""
+        self.output = output
+        self.fps = Fraction(fps).limit_denominator(1001)
+        self.file = None
+        self.shape = None
+
+    def open(self, shape):
+        if isinstance(self.output, str):
+            self.file = open(self.output, "wb")
+        else:
+            self.file = self.output
+        self.shape = shape
+        self.file.write(b"YUV4MPEG2 W%d H%d F%d:%d Ip A1:1 C444\n" %
+                        (shape[1], shape[0], self.fps.numerator, self.fps.denominator))
+
+    def write(self, image, frame=None):
+        """Acrescenta a imagem como próximo quadro do vídeo."""
+        name = self.name(frame)
+        self.encode(image, name)
+        return name
+
+    def name(self, frame=None):
+        return self.output if isinstance(self.output, str) else None
+
+    def encode(self, image, name):
+        if self.file is None:
+            self.open(image.shape[:2])
+        elif image.shape[:2] != self.shape:
+            raise ValueError("Y4M frames must all be %dx%d" % (self.shape[1], self.shape[0]))
+
+        rgb = image[:, :, :3].astype(np.float32)
+        y = rgb @ np.array([0.256788, 0.504129, 0.097906], dtype=np.float32) + 16
+        cb = rgb @ np.array([-0.148223, -0.290993, 0.439216], dtype=np.float32) + 128
+        cr = rgb @ np.array([0.439216, -0.367788, -0.071427], dtype=np.float32) + 128
+        planes = np.rint(np.stack((y, cb, cr))).clip(0, 255).astype(np.uint8)
+
+        self.file.write(b"FRAME\n")
+        self.file.write(planes.tobytes())
+        self.file.flush()
+
+    def filename(self, frame):
+        return self.output
+
+    def close(self):
+        if self.file is not None and isinstance(self.output, str):
+            self.file.close()
+        self.file = None
+
+
+class PyramidWriter(SequenceWriter):
+    """Sequência de imagens que grava também cópias reduzidas de cada imagem."""
+
+    # A imagem renderizada vai para o arquivo de sempre (nome0000.png) e cada tamanho pedido
+    # para nome0000_LARGURAxALTURA.png, reduzida por area_resize no mesmo encode. Assim as
+    # várias resoluções custam um render e algumas reduções de arrays, em vez de um render
+    # por tamanho.
+
+    def __init__(self, filename, level=None, sizes=()):
+        """Como no SequenceWriter; sizes são (largura, altura ou None) das reduções."""
+        super().__init__(filename, level)
+        self.sizes = sizes
+
+    def encode(self, image, name):
+        """Grava a imagem em name e as reduções nos nomes com o tamanho."""
+        super().encode(image, name)
+        for width, height in self.resolve(image.shape[1], image.shape[0]):
+            super().encode(area_resize(image, width, height), self.resized(name, width, height))
+
+    def resolve(self, width, height):
+        """Tamanhos (largura, altura) para uma imagem width x height, sem altura mantém a proporção."""
+        sizes = []
+        for size_width, size_height in self.sizes:
+            if size_height is None:
+                size_height = max(1, round(height * size_width / width))
+            if size_width > width or size_height > height:
+                raise ValueError("Size %dx%d is larger than the %dx%d image" %
+                                 (size_width, size_height, width, height))
+            sizes.append((size_width, size_height))
+        return sizes
+
+    @staticmethod
+    def resized(name, width, height):
+        base, extension = os.path.splitext(name)
+        return "%s_%dx%d%s" % (base, width, height, extension)
+
+
+def area_resize(image, width, height):
+    """Reduz a imagem (altura, largura, canais) para width x height pela média de área."""
+    # Cada pixel de saída é a média dos pixels de entrada que ele cobre, com peso pela área
+    # coberta (filtro de caixa exato, também para fatores não inteiros). Por eixo é a
+    # diferença da soma acumulada nas bordas dos pixels de saída.
+    data = image.astype(np.float64)
+    data = _area_axis(data, height, 0)
+    data = _area_axis(data, width, 1)
+    if image.dtype == np.uint8:
+        return np.rint(data).clip(0, 255).astype(np.uint8)
+    return data.astype(image.dtype)
+
+
+def _area_axis(data, size, axis):
+    length = data.shape[axis]
+    if length % size == 0:  # fator inteiro: média de blocos
+        shape = data.shape[:axis] + (size, length // size) + data.shape[axis + 1:]
+        return data.reshape(shape).mean(axis=axis + 1)
+    # integral da imagem (constante em cada pixel) nas bordas dos pixels de saída
+    cumulative = np.cumsum(data, axis=axis)
+    cumulative = np.concatenate((np.zeros_like(np.take(cumulative, [0], axis)), cumulative), axis)
+    edges = np.arange(size + 1) * (length / size)
+    index = np.minimum(edges.astype(int), length - 1)
+    fraction = (edges - index).reshape((-1,) + (1,) * (data.ndim - axis - 1))
+    integral = np.take(cumulative, index, axis) + fraction * np.take(data, index, axis)
+    return np.diff(integral, axis=axis) * (size / length)
+
+
+def writer(filename, fps=30, level=None, sizes=None):
+    """Escolhe o escritor pela extensão do arquivo de saída (sizes grava também reduções)."""
+    if filename.lower().endswith(".y4m"):
+        if sizes:
+            raise ValueError("Reduced sizes are only written for image sequences, not .y4m")
+        return Y4MWriter(filename, fps)
+    if sizes:
+        return PyramidWriter(filename, level, sizes)
+    return SequenceWriter(filename, level)
+
+
+class StreamWriter:
+    """Imagem gravada aos poucos, uma faixa de linhas por vez (PNG, PPM ou NPY)."""
+
+    # Para imagens grandes demais para a memória (ver Renderizador.render_strips): o
+    # cabeçalho é gravado antes e cada faixa recebida vai direto para o arquivo. No PNG as
+    # linhas passam por um só compressor zlib e cada trecho comprimido vira um chunk IDAT;
+    # no NPY o arquivo é mapeado em memória (open_memmap) e as faixas copiadas no lugar.
+
+    def __init__(self, filename, width, height, level=None):
+        """Cria o arquivo de largura x altura pixels RGB; level é a compressão do PNG."""
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.row = 0  # próxima linha a gravar
+        self.extension = filename.split('.')[-1].lower()
+        if self.extension == "npy":
+            self.array = np.lib.format.open_memmap(filename, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+            return
+        if self.extension not in ("png", "ppm"):
+            raise ValueError("Strip rendering writes PNG, PPM or NPY files, not %s" % filename)
+
+        self.file = open(filename, "wb")
+        if self.extension == "ppm":
+            self.file.write(b"P6\n%d %d\n255\n" % (width, height))
+        else:
+            self.compressor = zlib.compressobj(-1 if level is None else level)
+            self.file.write(b"\x89PNG\r\n\x1a\n")
+            # 8 bits por canal, RGB, sem entrelaçamento
+            self.chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)) + kind + data)
+        self.file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    def write(self, rows):
+        """Acrescenta as linhas (quantidade, largura, 3 ou 4) em uint8 abaixo das anteriores."""
+        rows = rows[:, :, :3]
+        if rows.shape[1] != self.width or self.row + rows.shape[0] > self.height:
+            raise ValueError("Strip does not fit the %dx%d image" % (self.width, self.height))
+        if self.extension == "npy":
+            self.array[self.row:self.row + rows.shape[0]] = rows
+        elif self.extension == "ppm":
+            self.file.write(np.ascontiguousarray(rows).tobytes())
+        else:
+            lines = np.zeros((rows.shape[0], 1 + self.width * 3), dtype=np.uint8)  # filtro 0 (nenhum)
+            lines[:, 1:] = rows.reshape(rows.shape[0], -1)
+            data = self.compressor.compress(lines.tobytes())
+            if data:
+                self.chunk(b"IDAT", data)
+        self.row += rows.shape[0]
+
+    def close(self):
+        """Termina o arquivo."""
+        if self.extension == "npy":
+            self.array.flush()
+            del self.array
+            return
+        if self.extension == "png":
+            self.chunk(b"IDAT", self.compressor.flush())
+            self.chunk(b"IEND", b"")
+        self.file.close()
+
+
+class AuxiliaryWriter:
+    """Planos auxiliares de cada quadro (profundidade, id do objeto e posição) em arquivos .npy."""
+
+    # Para tela.png os planos vão para tela_depth0000.npy (float32, de -1.0 a 1.0),
+    # tela_id0000.npy (int32, 0 onde não há objeto) e tela_position0000.npy (float32, x, y
+    # e z no mundo), numerados como as imagens; tela_id.json dá o nome (DEF) de cada id. Os
+    # arquivos são criados com open_memmap e preenchidos no lugar, então um quadro grande
+    # não passa por uma cópia na memória e quem lê pode abrir só o trecho que precisa
+    # (np.load com mmap_mode).
+
+    planes = {"depth": (np.float32, ()), "id": (np.int32, ()), "position": (np.float32, (3,))}
+
+    def __init__(self, filename, positions=False):
+        """Define os arquivos pelo nome das imagens e se as posições no mundo são gravadas."""
+        self.base = filename.split('.')[0]
+        self.positions = positions
+        self.writers = {plane: SequenceWriter(self.base + "_" + plane + ".npy")
+                        for plane in AuxiliaryWriter.planes if positions or plane != "position"}
+        self.names = None  # último mapa de ids gravado
+
+    def write(self, fill, shape, frame=None, names=None):
+        """Cria os arquivos do quadro, preenchidos por fill(planos), e devolve os nomes."""
+        # fill recebe um dicionário plano -> array (altura, largura, ...) mapeado no arquivo
+        files = {plane: writer.name(frame) for plane, writer in self.writers.items()}
+        planes = {}
+        for plane, name in files.items():
+            dtype, extra = AuxiliaryWriter.planes[plane]
+            planes[plane] = np.lib.format.open_memmap(name, mode="w+", dtype=dtype, shape=tuple(shape) + extra)
+        fill(planes)
+        for array in planes.values():
+            array.flush()
+        del planes
+
+        if names is not None and names != self.names:
+            self.write_names(names)
+        return files
+
+    def write_names(self, names):
+        """Grava o nome (DEF) de cada id, "" para os objetos sem DEF."""
+        # Vários processos podem gravar o mesmo mapa; o replace troca o arquivo de uma vez
+        filename = self.base + "_id.json"
+        temporary = "%s.%d" % (filename, os.getpid())
+        with open(temporary, "w") as file:
+            json.dump({str(object_id): name for name, object_id in names.items()}, file, indent=1)
+        os.replace(temporary, filename)
+        self.names = dict(names)
+
+
+class FrameSink:
+    """Grava os quadros em threads em segundo plano enquanto os próximos são renderizados."""
+
+    # Os quadros enviados ficam numa fila limitada e são codificados por threads (a
+    # compressão do PNG no Pillow libera o GIL). Quando a fila enche o submit espera, assim
+    # a memória não cresce se a gravação for mais lenta que a renderização. Um escritor sem
+    # parallel (vídeo) usa uma só thread, que grava os quadros na ordem dos envios.
+
+    def __init__(self, writer, threads=1, queue_size=None):
+        """Inicia as threads de gravação; a fila limita quantos quadros esperam na memória."""
+        self.writer = writer
+        if not writer.parallel:
+            threads = 1
+        self.queue = queue.Queue(queue_size or 2 * threads)
+        self.error = None
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, image, frame=None, done=None):
+        """Envia uma cópia da imagem para gravar e devolve o arquivo em que será gravada."""
+        # done(arquivo) é chamado pela thread de gravação depois que o arquivo estiver pronto.
+        self.check()
+        name = self.writer.name(frame)
+        self.queue.put((np.array(image, copy=True), name, done))  # espera se a fila estiver cheia
+        return name
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue  # já falhou, só esvazia a fila para não travar quem envia
+            image, name, done = item
+            try:
+                self.writer.encode(image, name)
+                if done is not None:
+                    done(name)
+            except Exception as error:
+                self.error = error
+
+    def check(self):
+        if self.error is not None:
+            raise RuntimeError("Could not write frame: %s" % self.error) from self.error
+
+    def close(self):
+        """Espera gravar todos os quadros enviados e fecha o escritor."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.writer.close()
+        self.check()
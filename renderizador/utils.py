@@ -2,6 +2,7 @@ from PIL import Image
 import numpy as np
 import math
 import time
+import bisect
 
 from numpy.lib.twodim_base import tri
 
@@ -113,98 +114,213 @@ def get_quaternion_rotation_matrix(rotation):
         [0, 0, 0, 1]
     ])
 
-def apply_point_transformations(point, gl):
-    homogenous_p = np.matrix([[point[0]], [point[1]], [point[2]], [1]])
-    clip_point = gl.mvp.dot(homogenous_p)
-    normalized_clip_point = np.divide(clip_point, clip_point[3][0])
-    screen_point = gl.point_to_screen.dot(normalized_clip_point)
+def transform_instances(point, mvps, models, point_to_screen):
+    # Transforma todos os vértices de uma malha por N matrizes de uma só vez:
+    # vertices (V, 4), mvps e models (N, 4, 4) -> (N, V, 6) com
+    # [x e y de tela, z de recorte, x, y e z de mundo] para cada vértice de cada instância
+    vertices = np.ones((len(point) // 3, 4))
+    vertices[:, :3] = np.reshape(np.asarray(point[:len(vertices) * 3], dtype=np.float64), (-1, 3))
 
-    world = gl.transformation_matrix_stack.dot(homogenous_p)
-    screen_point = np.matrix([[screen_point[0][0][0, 0]], 
-        [screen_point[1][0][0, 0]], 
-        [clip_point[2][0][0, 0]], 
-        [world[0][0][0, 0]], 
-        [world[1][0][0, 0]],
-        [world[2][0][0, 0]]
-        ])
+    clip_points = np.einsum("nij,vj->nvi", np.asarray(mvps), vertices)
+    normalized_clip_points = clip_points / clip_points[:, :, 3:4]
+    screen_points = np.einsum("ij,nvj->nvi", np.asarray(point_to_screen), normalized_clip_points)
+    world = np.einsum("nij,vj->nvi", np.asarray(models), vertices)
 
-    return screen_point
+    transformed = np.empty(clip_points.shape[:2] + (6,))
+    transformed[:, :, 0:2] = screen_points[:, :, 0:2]
+    transformed[:, :, 2] = clip_points[:, :, 2]
+    transformed[:, :, 3:6] = world[:, :, 0:3]
+    return transformed
 
 def transform_points(point, gl):
     print("\n--> Transforming Points")
     start_time = time.time()
-    screen_points = []
 
-    for i in range(0, len(point) - 2, 3):
-        p = [point[i], point[i + 1], point[i + 2]]
-        screen_points += [apply_point_transformations(p, gl)]
-    
+    screen_points = transform_instances(point, [gl.mvp], [gl.transformation_matrix_stack], gl.point_to_screen)[0].tolist()
+
     print("::: Time to transform points: %s seconds :::\n" % (time.time() - start_time))
     return screen_points
 
+def screen_bounds(screen_points, width, height):
+    # Retângulo (min_x, min_y, max_x, max_y) em subamostras que contém os vértices em tela,
+    # arredondado como o AABB do raster; vértices inválidos (ex.: atrás da câmera) ocupam a tela toda
+    xy = screen_points[:, :2]
+    if not np.isfinite(xy).all(): return (0, 0, width, height)
+    min_x, min_y = np.floor(xy.min(axis=0))
+    max_x, max_y = np.floor(xy.max(axis=0)) + 1
+    return (int(min_x), int(min_y), int(max_x), int(max_y))
+
 def hermite_interpolation(key, keyValue, closed, set_fraction):
+    # set_fraction pode ser um número ou um array de frações (ver HermiteCurve.evaluate)
     Rasterizer.clear_flag = True
-    s = 0
-    list_size = 3
-
-    for k in range(len(key)):
-        if set_fraction < key[k]:
-            k -= 1
-            s = (set_fraction - key[k]) / (key[k + 1] - key[k])
-            break
-
-    k_offset = (k) * list_size
-    k_plus_one_offset = (k + 1) * list_size
-    k_plus_two_offset = (k + 2) * list_size
-    k_minus_one_offset = (k - 1) * list_size
-
-    if k_plus_one_offset >= len(keyValue):
-        if not closed: return [0, 0, 0]
-        k_plus_one_offset = 0
-        k_plus_two_offset = list_size
+    curve = HermiteCurve.compile(key, keyValue, closed)
+    if np.ndim(set_fraction): return curve.evaluate(set_fraction)
+    return curve.value(set_fraction)
 
-    if k_plus_two_offset >= len(keyValue):
-        if not closed: return [0, 0, 0]
-        k_plus_two_offset = 0
-
-    v_k_minus_one = [0, 0, 0]
-    if k_minus_one_offset >= 0:
-        v_k_minus_one = keyValue[k_minus_one_offset : k_minus_one_offset + list_size]
-
-    v_k = keyValue[k_offset : k_offset + list_size]
-    v_k_plus_one = keyValue[k_plus_one_offset : k_plus_one_offset + list_size]
-    v_k_plus_two = keyValue[k_plus_two_offset : k_plus_two_offset  + list_size]
+def linear_interpolation(key, keyValue, set_fraction):
+    # set_fraction pode ser um número ou um array de frações (ver OrientationCurve.evaluate)
+    Rasterizer.clear_flag = True
+    curve = OrientationCurve.compile(key, keyValue)
+    if np.ndim(set_fraction): return curve.evaluate(set_fraction)
+    return curve.value(set_fraction)
 
-    T_0 = [(v_k_plus_one[i] - v_k_minus_one[i]) / 2 for i in range(list_size)]
-    T_1 = [(v_k_plus_two[i] - v_k[i]) / 2 for i in range(list_size)]
+class HermiteCurve:
+    # Spline de Hermite (Catmull-Rom) de um SplinePositionInterpolator pré-compilada: para
+    # cada segmento k guarda H * [v_k, v_k+1, T_0, T_1], assim avaliar é achar o segmento
+    # com busca binária nas chaves (O(log n)) e fazer [s³, s², s, 1] vezes essa matriz.
+    # Segmentos sem vizinhos (curva aberta) valem [0, 0, 0], como na versão anterior.
 
-    hermite_H = np.matrix([
+    hermite_H = np.array([
         [2, -2, 1, 1], 
         [-3, 3, -2, -1],
         [0, 0, 1, 0],
         [1, 0, 0, 0]
     ])
 
-    S = np.matrix([[s ** 3, s ** 2, s, 1]])
-    C = np.matrix([v_k, v_k_plus_one, T_0, T_1])
-    V_s = np.dot(S, np.dot(hermite_H, C))
+    compiled = {}  # id do keyValue -> curva, compilada uma vez por interpolador
 
-    return V_s.tolist()[0]
+    def __init__(self, key, keyValue, closed):
+        self.source = (key, keyValue, closed)
+        self.key = [float(k) for k in key]
+        list_size = 3
+        values = [float(v) for v in keyValue]
+        self.segments = np.zeros((len(self.key), 4, list_size))
 
-def linear_interpolation(key, keyValue, set_fraction):
-    Rasterizer.clear_flag = True
-    t = 0
+        for k in range(len(self.key)):
+            k_offset = (k) * list_size
+            k_plus_one_offset = (k + 1) * list_size
+            k_plus_two_offset = (k + 2) * list_size
+            k_minus_one_offset = (k - 1) * list_size
 
-    for k in range(len(key)):
-        if set_fraction < key[k]:
-            t = (set_fraction - key[k - 1]) / (key[k] - key[k - 1])
-            break
-    
-    prev_value = keyValue[(k - 1) * 4 + 3]
-    k *= 4
-    value_changed = [keyValue[k], keyValue[k + 1], keyValue[k + 2], prev_value + (t * (keyValue[k + 3] - prev_value))]
+            if k_plus_one_offset >= len(values):
+                if not closed: continue
+                k_plus_one_offset = 0
+                k_plus_two_offset = list_size
+
+            if k_plus_two_offset >= len(values):
+                if not closed: continue
+                k_plus_two_offset = 0
+
+            v_k_minus_one = [0, 0, 0]
+            if k_minus_one_offset >= 0:
+                v_k_minus_one = values[k_minus_one_offset : k_minus_one_offset + list_size]
+
+            v_k = values[k_offset : k_offset + list_size]
+            v_k_plus_one = values[k_plus_one_offset : k_plus_one_offset + list_size]
+            v_k_plus_two = values[k_plus_two_offset : k_plus_two_offset  + list_size]
+
+            T_0 = [(v_k_plus_one[i] - v_k_minus_one[i]) / 2 for i in range(list_size)]
+            T_1 = [(v_k_plus_two[i] - v_k[i]) / 2 for i in range(list_size)]
+
+            C = np.array([v_k, v_k_plus_one, T_0, T_1])
+            self.segments[k] = np.dot(HermiteCurve.hermite_H, C)
 
-    return value_changed
+    @staticmethod
+    def compile(key, keyValue, closed):
+        curve = HermiteCurve.compiled.get(id(keyValue))
+        if curve is None or curve.source[0] is not key or curve.source[1] is not keyValue or curve.source[2] != closed:
+            curve = HermiteCurve.compiled[id(keyValue)] = HermiteCurve(key, keyValue, closed)
+        return curve
+
+    def segment(self, set_fraction):
+        # Segmento e parâmetro s de uma fração; depois da última chave fica na última
+        # (s = 0) e antes da primeira fica no primeiro valor
+        k = bisect.bisect_right(self.key, set_fraction) - 1
+        if k < 0 or k == len(self.key) - 1: return max(k, 0), 0
+        return k, (set_fraction - self.key[k]) / (self.key[k + 1] - self.key[k])
+
+    def value(self, set_fraction):
+        k, s = self.segment(set_fraction)
+        S = np.array([[s ** 3, s ** 2, s, 1]])
+        return np.dot(S, self.segments[k]).tolist()[0]
+
+    def evaluate(self, fractions):
+        # Todas as frações de uma vez (ex.: a animação inteira), retorna um array (N, 3)
+        fractions = np.asarray(fractions, dtype=np.float64)
+        key = np.asarray(self.key)
+        k = np.searchsorted(key, fractions, side="right") - 1
+        clamped = (k < 0) | (k == len(key) - 1)
+        k = np.clip(k, 0, len(key) - 1)
+        following = np.minimum(k + 1, len(key) - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = np.where(clamped, 0, (fractions - key[k]) / (key[following] - key[k]))
+        S = np.stack([s ** 3, s ** 2, s, np.ones_like(s)], axis=-1)
+        return np.einsum("ni,nij->nj", S, self.segments[k])
+
+class OrientationCurve:
+    # Interpolação das rotações de um OrientationInterpolator pré-compilada: para cada
+    # chave guarda o eixo, o ângulo anterior e a chave anterior, assim avaliar é uma busca
+    # binária nas chaves (O(log n)) e uma interpolação linear do ângulo.
+
+    compiled = {}  # id do keyValue -> curva, compilada uma vez por interpolador
+
+    def __init__(self, key, keyValue):
+        self.source = (key, keyValue)
+        self.key = [float(k) for k in key]
+        values = [float(v) for v in keyValue]
+        self.axis = [values[k * 4:k * 4 + 3] for k in range(len(self.key))]
+        self.angle = [values[k * 4 + 3] for k in range(len(self.key))]
+        self.previous_angle = [values[(k - 1) * 4 + 3] for k in range(len(self.key))]
+        self.previous_key = [self.key[k - 1] for k in range(len(self.key))]
+
+    @staticmethod
+    def compile(key, keyValue):
+        curve = OrientationCurve.compiled.get(id(keyValue))
+        if curve is None or curve.source[0] is not key or curve.source[1] is not keyValue:
+            curve = OrientationCurve.compiled[id(keyValue)] = OrientationCurve(key, keyValue)
+        return curve
+
+    def value(self, set_fraction):
+        k = bisect.bisect_right(self.key, set_fraction)
+        t = 0
+        if k == len(self.key): k -= 1  # depois da última chave
+        else: t = (set_fraction - self.previous_key[k]) / (self.key[k] - self.previous_key[k])
+
+        prev_value = self.previous_angle[k]
+        return self.axis[k] + [prev_value + (t * (self.angle[k] - prev_value))]
+
+    def evaluate(self, fractions):
+        # Todas as frações de uma vez (ex.: a animação inteira), retorna um array (N, 4)
+        fractions = np.asarray(fractions, dtype=np.float64)
+        key = np.asarray(self.key)
+        k = np.searchsorted(key, fractions, side="right")
+        after = k == len(key)
+        k = np.minimum(k, len(key) - 1)
+        previous_key = np.asarray(self.previous_key)[k]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(after, 0, (fractions - previous_key) / (key[k] - previous_key))
+        previous_angle = np.asarray(self.previous_angle)[k]
+        angle = previous_angle + t * (np.asarray(self.angle)[k] - previous_angle)
+        return np.column_stack([np.asarray(self.axis)[k], angle])
+
+class TransformCache:
+    # Matrizes de um Transform (em um caminho do grafo) guardadas entre quadros.
+    # Cada matriz só é recalculada quando aquilo de que depende mudou: a local quando a
+    # versão do nó muda (ROUTE), a de mundo quando a local ou a do pai mudam e a MVP
+    # quando a de mundo ou a câmera mudam.
+
+    def __init__(self):
+        self.node_version = None    # versão do nó usada na matriz local
+        self.parent_version = None  # world_version do pai usada na matriz de mundo
+        self.view_version = None    # versão da câmera usada na MVP
+        self.world_version = 0      # incrementa sempre que a matriz de mundo muda
+        self.local = None
+        self.world = None
+        self.mvp = None
+
+class RetainedGeometry:
+    # Vértices de uma malha já transformados para a tela por uma MVP, guardados entre
+    # quadros junto com o preparo de cada triângulo. Como a MVP de um Transform só é
+    # trocada por outra matriz quando algo muda (ver TransformCache), a entrada vale
+    # enquanto a malha e a matriz forem os mesmos objetos.
+
+    def __init__(self, point, mvp, model):
+        self.point = point
+        self.mvp = mvp
+        self.model = model
+        self.screen_points = None
+        self.bounds = None  # limites dos vértices em tela (ver screen_bounds)
+        self.setups = {}  # ids dos vértices do triângulo -> dados de Rasterizer.triangle_setup
 
 class RenderProcesses:
 
@@ -247,6 +363,18 @@ class Light:
         Light.has_light = True
         Light.color = color
 
+    @staticmethod
+    def snapshot():
+        # Cópia dos valores atuais para o Rasterizer.light, que continua valendo para o
+        # quadro sendo rasterizado enquanto o traversal do próximo muda a luz (ver pipeline)
+        light = Light()
+        light.has_light = Light.has_light
+        light.ambient_intensity = Light.ambient_intensity
+        light.color = Light.color
+        light.intensity = Light.intensity
+        light.direction = Light.direction
+        return light
+
 class Rasterizer:
 
     width = None
@@ -256,9 +384,26 @@ class Rasterizer:
     gpu_instance = None
     buffer_length = None
     clear_flag = False
-    z_buffer = []
     frame_buffer = []
     mip_maps_textures = {}
+    setups = None  # preparo dos triângulos guardado para a malha atual (ver GL.retained)
+    incremental = True  # redesenha só as regiões da tela que mudaram desde o quadro anterior
+    tile_size = 8       # lado (em pixels da imagem final) dos blocos de região suja
+    draws = None        # desenhos do quadro anterior: chave -> (objetos da chave, limites)
+    state = None        # estado global (iluminação) do quadro anterior
+    clip = None         # retângulos (em subamostras) aos quais o raster se limita, None é tudo
+    regions = None      # retângulos (em pixels) a resolver no sample, None é a tela inteira
+    resolved = None     # imagem final (altura, largura, 3) resolvida nos quadros anteriores
+    light = Light       # luz usada no raster, a própria Light ou uma cópia (Light.snapshot)
+    origin = (0, 0)     # canto (em pixels da imagem inteira) da janela guardada nos buffers
+    scissor = None      # retângulo (em pixels da imagem inteira) ao qual raster e sample se limitam
+    stale = []          # retângulos (em subamostras) redesenhados com scissor, a refazer sem ele
+    auxiliary = False   # guarda também o id do objeto (e a posição no mundo) de cada amostra
+    object_id = 0       # id do objeto sendo desenhado (ver GL.object_draw)
+    object_ids = None   # ids dos objetos por subamostra (altura, largura)
+    positions = None    # posições no mundo por subamostra (altura, largura, 3), None se não guardadas
+    depth_terms = None  # (A, B) da projeção em que o z de recorte é A * z da câmera + B
+    z_buffer = None     # chaves do teste de profundidade por subamostra (altura, largura), ver raster
 
     class AABB:
         min_x = None
@@ -273,30 +418,223 @@ class Rasterizer:
             self.max_y = max_y
     
     @staticmethod
-    def setup(gpu_instance, width, height, sampling, z_test):
+    def setup(gpu_instance, width, height, sampling, z_test, window=None, near=0.01, far=1000):
         Rasterizer.gpu_instance = gpu_instance
-        Rasterizer.width = width
-        Rasterizer.height = height
         Rasterizer.sampling = sampling
         Rasterizer.z_test = z_test
-        Rasterizer.buffer_length = (Rasterizer.sampling ** 2) * width * height
+        # Com c o z de recorte, o z normalizado é c / w = A * c / (B - c), que com a conta
+        # em 1 / c (interpolado no raster) fica A / (B / c - 1): crescente com c
+        Rasterizer.depth_terms = (-(far + near) / (far - near), -2 * far * near / (far - near))
         RenderProcesses.pre_render += [Rasterizer.mip_maps]
         RenderProcesses.post_render += [Rasterizer.sample]
+        Rasterizer.resize(*(window or (0, 0, width, height)))
+
+    @staticmethod
+    def resize(x, y, width, height):
+        # Os buffers guardam só a janela (x, y, largura, altura) da imagem inteira, em pixels.
+        # Os vértices continuam em coordenadas da imagem inteira (as contas do raster são as
+        # mesmas do quadro inteiro) e só o endereço nos buffers é deslocado pelo canto da
+        # janela (origin), assim os pixels renderizados são idênticos aos do quadro inteiro.
+        Rasterizer.origin = (x, y)
+        Rasterizer.width = width
+        Rasterizer.height = height
+        Rasterizer.buffer_length = (Rasterizer.sampling ** 2) * width * height
+        Rasterizer.resolved = np.zeros((height, width, 3), dtype=np.uint8)
+        Rasterizer.z_buffer = np.full((height * Rasterizer.sampling, width * Rasterizer.sampling), np.inf)
+        Rasterizer.draws = None  # o próximo quadro redesenha a janela toda
+        Rasterizer.stale = []
+        if Rasterizer.auxiliary:
+            Rasterizer.set_auxiliary(Rasterizer.positions is not None)
         Rasterizer.prepare_frame()
 
+    @staticmethod
+    def set_scissor(region):
+        # Só o retângulo (min_x, min_y, max_x, max_y) é rasterizado e resolvido, o resto da
+        # imagem resolvida continua o dos quadros anteriores; None volta para a janela toda.
+        # As limpezas também ficam no retângulo (ver prepare_frame e begin_frame).
+        Rasterizer.scissor = region
+
+    @staticmethod
+    def limits():
+        # Retângulo (em pixels da imagem inteira) que pode ser desenhado: a janela dos
+        # buffers, cortada pelo scissor; pode ficar vazio (máximos menores que os mínimos)
+        x, y = Rasterizer.origin
+        limits = (x, y, x + Rasterizer.width, y + Rasterizer.height)
+        if Rasterizer.scissor is not None:
+            limits = (max(limits[0], Rasterizer.scissor[0]), max(limits[1], Rasterizer.scissor[1]),
+                      min(limits[2], Rasterizer.scissor[2]), min(limits[3], Rasterizer.scissor[3]))
+        return limits
+
+    @staticmethod
+    def window():
+        # Janela dos buffers em subamostras da imagem inteira (min_x, min_y, max_x, max_y)
+        sampling = Rasterizer.sampling
+        x, y = Rasterizer.origin
+        return (x * sampling, y * sampling, (x + Rasterizer.width) * sampling, (y + Rasterizer.height) * sampling)
+
+    @staticmethod
+    def set_auxiliary(positions=False):
+        # Planos auxiliares, em subamostras como o DEPTH_ATTACHMENT: o id do objeto e, se
+        # pedido, a posição no mundo da amostra visível (ver resolve_auxiliary)
+        shape = (Rasterizer.height * Rasterizer.sampling, Rasterizer.width * Rasterizer.sampling)
+        Rasterizer.auxiliary = True
+        Rasterizer.object_ids = np.zeros(shape, dtype=np.int32)
+        Rasterizer.positions = np.full(shape + (3,), np.nan, dtype=np.float32) if positions else None
+
     @staticmethod
     def prepare_frame():
+        # Com scissor só o retângulo dele é apagado, o resto continua o dos quadros anteriores
+        if Rasterizer.scissor is not None and len(Rasterizer.frame_buffer) == Rasterizer.buffer_length:
+            window_x, window_y = Rasterizer.window()[:2]
+            min_x, min_y, max_x, max_y = (v * Rasterizer.sampling for v in Rasterizer.limits())
+            if min_x < max_x and min_y < max_y:
+                Rasterizer.clear_region((min_x - window_x, min_y - window_y, max_x - window_x, max_y - window_y))
+            return
+
         Rasterizer.frame_buffer = [[0, 0, 0]] * (Rasterizer.buffer_length)
 
         if Rasterizer.z_test:
-            Rasterizer.z_buffer = [None] * (Rasterizer.buffer_length)
+            Rasterizer.clear_depth()
+
+    @staticmethod
+    def clear_region(region):
+        # Apaga um retângulo (em subamostras, posições nos buffers) do frame_buffer e, com
+        # teste de profundidade, do z_buffer e do DEPTH_ATTACHMENT
+        min_x, min_y, max_x, max_y = region
+        column = Rasterizer.height * Rasterizer.sampling
+        for x in range(min_x, max_x):
+            Rasterizer.frame_buffer[x * column + min_y:x * column + max_y] = [[0, 0, 0]] * (max_y - min_y)
+        if Rasterizer.z_test:
+            Rasterizer.clear_depth(region)
+
+    @staticmethod
+    def clear_depth(region=None):
+        # Apaga o z_buffer e o DEPTH_ATTACHMENT (em subamostras) do framebuffer de desenho da
+        # GPU, todos ou só a região (em subamostras); o attachment recebe o clear_depth
+        if region is None: region = (0, 0, Rasterizer.z_buffer.shape[1], Rasterizer.z_buffer.shape[0])
+        min_x, min_y, max_x, max_y = region
+        Rasterizer.z_buffer[min_y:max_y, min_x:max_x] = np.inf
+        gpu = Rasterizer.gpu_instance
+        if gpu.draw_framebuffer >= len(gpu.frame_buffer): return  # framebuffers ainda não alocados
+        depth = gpu.get_draw_depth_buffer()
+        if depth.size == 0: return
+        mode = gpu.depth_mode(depth)
+        gpu.draw_region(region, mode, gpu.depth_value(gpu.clear_depth_val, mode))
+
+    @staticmethod
+    def pack_depth(keys, mode):
+        # Valores do DEPTH_ATTACHMENT no modo dado para chaves do z_buffer (ver raster); as
+        # amostras sem nada desenhado (chave infinita) ficam com o clear_depth
+        gpu = Rasterizer.gpu_instance
+        empty = np.isinf(keys)
+        if mode == gpu.DEPTH_COMPONENT16:
+            values = np.clip(keys, 0, 65535)
+        else:
+            depth_scale, depth_slope = Rasterizer.depth_terms
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = gpu.depth_value(depth_scale / (-depth_slope * keys - 1), mode)
+        values[empty] = gpu.depth_value(gpu.clear_depth_val, mode)
+        return values
+
+    @staticmethod
+    def begin_frame(draws):
+        # Modo incremental: recebe os desenhos do quadro como (objetos que o definem, limites
+        # em subamostras) e compara com o quadro anterior. Os limites antigos e novos de
+        # tudo que mudou (entrou, saiu ou se moveu) marcam blocos sujos; só esses blocos são
+        # limpos, redesenhados (ver overlaps e clip) e resolvidos no sample.
+        Rasterizer.clip = None
+        Rasterizer.regions = None
+
+        # O DEPTH_ATTACHMENT de desenho pode ter sido apagado (GPU.clear_buffer no pre) ou ser
+        # de outro quadro; o z_buffer continua valendo, então o attachment é refeito dele
+        if Rasterizer.z_test:
+            depth = Rasterizer.gpu_instance.get_draw_depth_buffer()
+            if depth.shape[:2] == Rasterizer.z_buffer.shape:
+                depth[:, :, 0] = Rasterizer.pack_depth(Rasterizer.z_buffer, Rasterizer.gpu_instance.depth_mode(depth))
+
+        if not Rasterizer.incremental: return
+
+        if Rasterizer.scissor is not None:
+            # Com scissor o retângulo dele é limpo e redesenhado inteiro. Os desenhos e a
+            # iluminação do quadro continuam os do último quadro sem scissor, que é o que o
+            # resto da tela mostra; o retângulo fica em stale para ser refeito depois dele.
+            Rasterizer.prepare_frame()
+            region = Rasterizer.limits()
+            Rasterizer.regions = [region]
+            Rasterizer.clip = [tuple(v * Rasterizer.sampling for v in region)]
+            Rasterizer.stale.append(Rasterizer.clip[0])
+            return
+
+        light = Rasterizer.light
+        state = (light.has_light, light.ambient_intensity, light.intensity,
+                 tuple(light.color or ()), tuple(light.direction or ()))
+        current = {}
+        for objects, bounds in draws:
+            current[tuple(map(id, objects))] = (objects, bounds)
+
+        previous = Rasterizer.draws
+        Rasterizer.draws = current
+        stale, Rasterizer.stale = Rasterizer.stale, []
+        if previous is None or state != Rasterizer.state:
+            Rasterizer.state = state
+            Rasterizer.prepare_frame()  # primeiro quadro ou iluminação mudou: tela inteira
+            return
+
+        changed = [bounds for key, (_, bounds) in current.items() if key not in previous]
+        changed += [bounds for key, (_, bounds) in previous.items() if key not in current]
+        changed += stale
+
+        # Blocos contados a partir do canto da janela dos buffers
+        tile = Rasterizer.tile_size * Rasterizer.sampling
+        columns = -(-Rasterizer.width // Rasterizer.tile_size)
+        rows = -(-Rasterizer.height // Rasterizer.tile_size)
+        window_x, window_y = Rasterizer.window()[:2]
+        dirty = set()
+        for min_x, min_y, max_x, max_y in changed:
+            min_x, min_y, max_x, max_y = min_x - window_x, min_y - window_y, max_x - window_x, max_y - window_y
+            for tx in range(max(min_x // tile, 0), min((max_x - 1) // tile + 1, columns)):
+                for ty in range(max(min_y // tile, 0), min((max_y - 1) // tile + 1, rows)):
+                    dirty.add((tx, ty))
+
+        # Junta os blocos sujos de cada coluna em retângulos sem sobreposição
+        regions = []
+        for tx, ty in sorted(dirty):
+            if regions and regions[-1][0] == tx and regions[-1][3] == ty:
+                regions[-1][3] = ty + 1
+            else:
+                regions.append([tx, ty, tx + 1, ty + 1])
+
+        size = Rasterizer.tile_size
+        regions = [(x0 * size, y0 * size, min(x1 * size, Rasterizer.width),
+                    min(y1 * size, Rasterizer.height)) for x0, y0, x1, y1 in regions]
+
+        # Limpa só as regiões sujas dos buffers
+        for region in regions:
+            Rasterizer.clear_region(tuple(v * Rasterizer.sampling for v in region))
+
+        # Regiões e clip em coordenadas da imagem inteira, como os vértices
+        x, y = Rasterizer.origin
+        Rasterizer.regions = [(x0 + x, y0 + y, x1 + x, y1 + y) for x0, y0, x1, y1 in regions]
+        Rasterizer.clip = [tuple(v * Rasterizer.sampling for v in region) for region in Rasterizer.regions]
+
+        print("--> Dirty regions: %d of %d tiles" % (len(dirty), columns * rows))
+
+    @staticmethod
+    def overlaps(bounds):
+        # Se um desenho com esses limites (em subamostras) toca alguma região a redesenhar
+        if Rasterizer.clip is None: return True
+        min_x, min_y, max_x, max_y = bounds
+        for clip_min_x, clip_min_y, clip_max_x, clip_max_y in Rasterizer.clip:
+            if min_x < clip_max_x and clip_min_x < max_x and min_y < clip_max_y and clip_min_y < max_y:
+                return True
+        return False
 
     @staticmethod
     def render(triangles, colors, vertex_color=False, texture=None, uv=None, has_texture=False):
         start_time_render = time.time()
-        if Rasterizer.clear_flag: Rasterizer.prepare_frame()
+        if Rasterizer.clear_flag and not Rasterizer.incremental: Rasterizer.prepare_frame()
         raster = Rasterizer.raster
-        has_light = Light.has_light
+        has_light = Rasterizer.light.has_light
 
         for i in range(len(triangles)):
             start_time_raster = time.time()
@@ -321,6 +659,7 @@ class Rasterizer:
 
         textures = scene.current_appearance.texture.url
         current_texture = textures[0]
+        if current_texture in Rasterizer.mip_maps_textures: return  # textura compartilhada, já processada
         Rasterizer.mip_maps_textures[current_texture] = []
         texture = Rasterizer.gpu_instance.load_texture(current_texture)
 
@@ -385,26 +724,24 @@ class Rasterizer:
         print("|||| Time to pre process mip maps levels: %s seconds ||||\n" % (time.time() - start_mip_maps_time))
 
     @staticmethod
-    def raster(triangle, colors=None, vertex_color=False, texture=None, uv=None, has_texture=False, has_light=False):
-
-        start_time_raster_prep = time.time()
-        
-        ##!! For optimization purposes
-        height = Rasterizer.height
-        frame_buffer = Rasterizer.frame_buffer
-        z_buffer = Rasterizer.z_buffer
-        z_test = Rasterizer.z_test
-        sampling = Rasterizer.sampling
-
-        triangle_A_y = triangle[0][1][0, 0]
-        triangle_B_y = triangle[2][1][0, 0]
-        triangle_C_y = triangle[1][1][0, 0]
-        triangle_A_x = triangle[0][0][0, 0]
-        triangle_B_x = triangle[2][0][0, 0]
-        triangle_C_x = triangle[1][0][0, 0]
-        triangle_A_z = 1 / triangle[0][2][0, 0]
-        triangle_B_z = 1 / triangle[2][2][0, 0]
-        triangle_C_z = 1 / triangle[1][2][0, 0]
+    def triangle_setup(triangle):
+        # Preparo que só depende dos vértices em tela (arestas, denominadores baricêntricos
+        # e AABB). Com Rasterizer.setups, dado pelo cache de geometria do GL para a malha
+        # sendo desenhada, o preparo fica guardado enquanto os vértices não mudarem.
+        setups = Rasterizer.setups
+        if setups is not None:
+            key = (id(triangle[0]), id(triangle[1]), id(triangle[2]))
+            if key in setups: return setups[key]
+
+        triangle_A_y = triangle[0][1]
+        triangle_B_y = triangle[2][1]
+        triangle_C_y = triangle[1][1]
+        triangle_A_x = triangle[0][0]
+        triangle_B_x = triangle[2][0]
+        triangle_C_x = triangle[1][0]
+        triangle_A_z = 1 / triangle[0][2]
+        triangle_B_z = 1 / triangle[2][2]
+        triangle_C_z = 1 / triangle[1][2]
 
         B_x_minus_A_x = triangle_B_x - triangle_A_x
         B_y_minus_A_y = triangle_B_y - triangle_A_y
@@ -423,18 +760,82 @@ class Rasterizer:
         normal2 = (line2[1], - line2[0])
         normal3 = (line3[1], - line3[0])
 
-        dot = [[0, 0], [0, 0], [0, 0]]
-
         alpha_denominator = -(triangle_A_x - triangle_B_x) * (C_y_minus_B_y) + (triangle_A_y - triangle_B_y) * (C_x_minus_B_x)
         betha_denominator = -(triangle_B_x - triangle_C_x) * (A_y_minus_C_y) + (triangle_B_y - triangle_C_y) * (A_x_minus_C_x)
         
-        triangle_AABB = Rasterizer.AABB(int(triangle[0][0, 0]), int(triangle[0][1, 0]), int(triangle[0][0, 0] + 1), int(triangle[0][1, 0] + 1))
+        triangle_AABB = Rasterizer.AABB(int(triangle[0][0]), int(triangle[0][1]), int(triangle[0][0] + 1), int(triangle[0][1] + 1))
         for p in range(1, len(triangle)):
-            if triangle[p][0] > triangle_AABB.max_x: triangle_AABB.max_x = int(triangle[p][0, 0] + 1)
-            if triangle[p][0] < triangle_AABB.min_x: triangle_AABB.min_x = int(triangle[p][0, 0])
-            if triangle[p][1] > triangle_AABB.max_y: triangle_AABB.max_y = int(triangle[p][1, 0] + 1)
-            if triangle[p][1] < triangle_AABB.min_y: triangle_AABB.min_y = int(triangle[p][1, 0])
+            if triangle[p][0] > triangle_AABB.max_x: triangle_AABB.max_x = int(triangle[p][0] + 1)
+            if triangle[p][0] < triangle_AABB.min_x: triangle_AABB.min_x = int(triangle[p][0])
+            if triangle[p][1] > triangle_AABB.max_y: triangle_AABB.max_y = int(triangle[p][1] + 1)
+            if triangle[p][1] < triangle_AABB.min_y: triangle_AABB.min_y = int(triangle[p][1])
+
+        setup = (triangle_A_x, triangle_A_y, triangle_A_z,
+                 triangle_B_x, triangle_B_y, triangle_B_z,
+                 triangle_C_x, triangle_C_y, triangle_C_z,
+                 C_x_minus_B_x, C_y_minus_B_y, A_x_minus_C_x, A_y_minus_C_y,
+                 normal1, normal2, normal3,
+                 alpha_denominator, betha_denominator, triangle_AABB)
+
+        if setups is not None: setups[key] = setup
+        return setup
+
+    @staticmethod
+    def raster(triangle, colors=None, vertex_color=False, texture=None, uv=None, has_texture=False, has_light=False):
+
+        start_time_raster_prep = time.time()
         
+        ##!! For optimization purposes
+        height = Rasterizer.height
+        frame_buffer = Rasterizer.frame_buffer
+        sampling = Rasterizer.sampling
+
+        (triangle_A_x, triangle_A_y, triangle_A_z,
+         triangle_B_x, triangle_B_y, triangle_B_z,
+         triangle_C_x, triangle_C_y, triangle_C_z,
+         C_x_minus_B_x, C_y_minus_B_y, A_x_minus_C_x, A_y_minus_C_y,
+         normal1, normal2, normal3,
+         alpha_denominator, betha_denominator, triangle_AABB) = Rasterizer.triangle_setup(triangle)
+
+        # Só as partes do AABB dentro da janela (e do scissor) ou das regiões a redesenhar
+        # (modo incremental); triângulos fora delas nem passam pelo preparo das cores
+        window_x, window_y = Rasterizer.window()[:2]
+        limits = [v * sampling for v in Rasterizer.limits()]
+        regions = Rasterizer.clip
+        if regions is None: regions = [limits]
+        spans = [(max(triangle_AABB.min_x, clip[0], limits[0]), max(triangle_AABB.min_y, clip[1], limits[1]),
+                  min(triangle_AABB.max_x, clip[2], limits[2]), min(triangle_AABB.max_y, clip[3], limits[3]))
+                 for clip in regions]
+        spans = [span for span in spans if span[0] < span[2] and span[1] < span[3]]
+        if not spans: return
+
+        # Teste de profundidade: a chave de cada amostra é comparada com a do z_buffer (ganha a
+        # menor) e o DEPTH_ATTACHMENT da GPU recebe o valor no formato dele ao gravar a região
+        # (ver pack_depth). Em float a chave é -1 / z de recorte interpolado, sem arredondar,
+        # então a ordem entre triângulos (e os empates) é a de sempre; com DEPTH_COMPONENT16 é
+        # o próprio inteiro guardado, (z normalizado + 1) * 32767.5 arredondado.
+        gpu = Rasterizer.gpu_instance
+        depth_buffer = gpu.get_draw_depth_buffer()
+        z_test = Rasterizer.z_test and depth_buffer.size != 0
+        if z_test:
+            depth_mode = gpu.depth_mode(depth_buffer)
+            quantized = depth_mode == gpu.DEPTH_COMPONENT16
+            if quantized:  # z normalizado é A / (B / c - 1), com c o z de recorte (ver setup)
+                depth_scale, depth_slope = Rasterizer.depth_terms
+                depth_scale *= 32767.5
+
+        # Id do objeto e posição no mundo (interpolada como as cores por vértice) das amostras
+        auxiliary = Rasterizer.auxiliary and z_test
+        if auxiliary:
+            object_id = Rasterizer.object_id
+            positions = Rasterizer.positions is not None
+            if positions:
+                world_1 = [i * triangle_A_z for i in triangle[0][3:6]]
+                world_2 = [i * triangle_C_z for i in triangle[1][3:6]]
+                world_3 = [i * triangle_B_z for i in triangle[2][3:6]]
+
+        dot = [[0, 0], [0, 0], [0, 0]]
+
         if vertex_color:
             for color in colors:
                 color[0] *= 255
@@ -482,9 +883,10 @@ class Rasterizer:
             tex_shape_y = texture.shape[1] - 1
 
         elif has_light:
-            I_ia = Light.ambient_intensity
-            I_i = Light.intensity
-            I_Lrgb = Light.color
+            light = Rasterizer.light
+            I_ia = light.ambient_intensity
+            I_i = light.intensity
+            I_Lrgb = light.color
 
             O_Ergb = colors["emissiveColor"]
             O_Drgb = colors["diffuseColor"]
@@ -494,19 +896,19 @@ class Rasterizer:
             O_a = 0
             shiness = colors["shininess"]
 
-            L = np.asarray(Light.direction)
+            L = np.asarray(light.direction)
             v = np.array([0, 0, 1])
 
-            A_z = triangle[0][5][0, 0]
-            B_z = triangle[2][5][0, 0]
-            C_z = triangle[1][5][0, 0]
+            A_z = triangle[0][5]
+            B_z = triangle[2][5]
+            C_z = triangle[1][5]
 
-            A_x = triangle[0][3][0, 0]
-            A_y = triangle[0][4][0, 0]
-            B_x = triangle[2][3][0, 0]
-            B_y = triangle[2][4][0, 0]
-            C_x = triangle[1][3][0, 0]
-            C_y = triangle[1][4][0, 0]
+            A_x = triangle[0][3]
+            A_y = triangle[0][4]
+            B_x = triangle[2][3]
+            B_y = triangle[2][4]
+            C_x = triangle[1][3]
+            C_y = triangle[1][4]
 
             V0 = np.matrix([C_x - B_x, C_y - B_y, C_z - B_z])
             V1 = np.matrix([B_x - A_x, B_y - A_y, B_z - A_z])
@@ -536,59 +938,93 @@ class Rasterizer:
         print("--> Time to prep raster %s seconds" % (time.time() - start_time_raster_prep))
         start_time_raster_process = time.time()
 
-        for x in range(triangle_AABB.min_x, triangle_AABB.max_x):
-            x_minus_xA = x - triangle_A_x
-            x_minus_xB = x - triangle_B_x
-            x_minus_xC = x - triangle_C_x
-
-            dot[0][0] = x_minus_xA * normal1[0]
-            dot[1][0] = x_minus_xB * normal2[0]
-            dot[2][0] = x_minus_xC * normal3[0]
+        for min_x, min_y, max_x, max_y in spans:
+            # Posições nos buffers, que guardam só a janela (ver resize)
+            local_min_x, local_min_y, local_max_x, local_max_y = min_x - window_x, min_y - window_y, max_x - window_x, max_y - window_y
+            if z_test:  # chaves da região em listas por coluna, gravadas de volta no fim
+                z_region = Rasterizer.z_buffer[local_min_y:local_max_y, local_min_x:local_max_x]
+                depth_columns = z_region.T.tolist()
+            if auxiliary:
+                ids_region = Rasterizer.object_ids[local_min_y:local_max_y, local_min_x:local_max_x]
+                ids_columns = ids_region.T.tolist()
+                if positions:
+                    positions_region = Rasterizer.positions[local_min_y:local_max_y, local_min_x:local_max_x]
+                    positions_columns = positions_region.transpose(1, 0, 2).tolist()
+
+            for x in range(min_x, max_x):
+                if z_test: depth_column = depth_columns[x - min_x]
+                if auxiliary:
+                    ids_column = ids_columns[x - min_x]
+                    if positions: positions_column = positions_columns[x - min_x]
+                x_minus_xA = x - triangle_A_x
+                x_minus_xB = x - triangle_B_x
+                x_minus_xC = x - triangle_C_x
+
+                dot[0][0] = x_minus_xA * normal1[0]
+                dot[1][0] = x_minus_xB * normal2[0]
+                dot[2][0] = x_minus_xC * normal3[0]
             
-            for y in range(triangle_AABB.min_y, triangle_AABB.max_y):
-                y_minus_yA = y - triangle_A_y
-                y_minus_yB = y - triangle_B_y
-                y_minus_yC = y - triangle_C_y
-
-                dot[0][1] = y_minus_yA * normal1[1]
-                dot[1][1] = y_minus_yB * normal2[1]
-                dot[2][1] = y_minus_yC * normal3[1]
-
-                is_inside = True
-                for product in dot:
-                    if product[0] + product[1] > 0:
-                        is_inside = False
-                        break
-
-                if is_inside:
-                    alpha = (-(x_minus_xB) * (C_y_minus_B_y) + (y_minus_yB) * (C_x_minus_B_x)) / alpha_denominator
-                    betha = (-(x_minus_xC) * (A_y_minus_C_y) + (y_minus_yC) * (A_x_minus_C_x)) / betha_denominator
-                    gamma = 1 - alpha - betha
-
-                    z = triangle_A_z * alpha + triangle_C_z * gamma + triangle_B_z * betha
-                    offset = x * height * sampling + y
-
-                    if z_test:
-                        if z_buffer[offset] == None or z_buffer[offset] < z: z_buffer[offset] = z
-                        else: continue
-
-                    if vertex_color:
-                        colors = [
-                            (vertex_color_1[0] * alpha + vertex_color_2[0] * gamma + vertex_color_3[0] * betha) / z,
-                            (vertex_color_1[1] * alpha + vertex_color_2[1] * gamma + vertex_color_3[1] * betha) / z,
-                            (vertex_color_1[2] * alpha + vertex_color_2[2] * gamma + vertex_color_3[2] * betha) / z]
-
-                    elif has_texture:
-                        u = ((uv_1[0] * alpha + uv_2[0] * gamma + uv_3[0] * betha) / z) * tex_shape_x
-                        v = ((uv_1[1] * alpha + uv_2[1] * gamma + uv_3[1] * betha) / z) * - tex_shape_y
-
-                        # colors = [int(v) * 255, int(u) * 255, 0]
-                        colors = texture[int(v)][int(u)]
-
-                    elif has_light:
-                        pass
-
-                    frame_buffer[offset] = colors
+                for y in range(min_y, max_y):
+                    y_minus_yA = y - triangle_A_y
+                    y_minus_yB = y - triangle_B_y
+                    y_minus_yC = y - triangle_C_y
+
+                    dot[0][1] = y_minus_yA * normal1[1]
+                    dot[1][1] = y_minus_yB * normal2[1]
+                    dot[2][1] = y_minus_yC * normal3[1]
+
+                    is_inside = True
+                    for product in dot:
+                        if product[0] + product[1] > 0:
+                            is_inside = False
+                            break
+
+                    if is_inside:
+                        alpha = (-(x_minus_xB) * (C_y_minus_B_y) + (y_minus_yB) * (C_x_minus_B_x)) / alpha_denominator
+                        betha = (-(x_minus_xC) * (A_y_minus_C_y) + (y_minus_yC) * (A_x_minus_C_x)) / betha_denominator
+                        gamma = 1 - alpha - betha
+
+                        z = triangle_A_z * alpha + triangle_C_z * gamma + triangle_B_z * betha
+                        offset = (x - window_x) * height * sampling + y - window_y
+
+                        if z_test:
+                            if quantized: depth = int(depth_scale / (depth_slope * z - 1) + 32767.5 + .5)
+                            else: depth = -z
+                            if depth < depth_column[y - min_y]: depth_column[y - min_y] = depth
+                            else: continue
+
+                        if auxiliary:
+                            ids_column[y - min_y] = object_id
+                            if positions:
+                                positions_column[y - min_y] = [
+                                    (world_1[0] * alpha + world_2[0] * gamma + world_3[0] * betha) / z,
+                                    (world_1[1] * alpha + world_2[1] * gamma + world_3[1] * betha) / z,
+                                    (world_1[2] * alpha + world_2[2] * gamma + world_3[2] * betha) / z]
+
+                        if vertex_color:
+                            colors = [
+                                (vertex_color_1[0] * alpha + vertex_color_2[0] * gamma + vertex_color_3[0] * betha) / z,
+                                (vertex_color_1[1] * alpha + vertex_color_2[1] * gamma + vertex_color_3[1] * betha) / z,
+                                (vertex_color_1[2] * alpha + vertex_color_2[2] * gamma + vertex_color_3[2] * betha) / z]
+
+                        elif has_texture:
+                            u = ((uv_1[0] * alpha + uv_2[0] * gamma + uv_3[0] * betha) / z) * tex_shape_x
+                            v = ((uv_1[1] * alpha + uv_2[1] * gamma + uv_3[1] * betha) / z) * - tex_shape_y
+
+                            # colors = [int(v) * 255, int(u) * 255, 0]
+                            colors = texture[int(v)][int(u)]
+
+                        elif has_light:
+                            pass
+
+                        frame_buffer[offset] = colors
+
+            if z_test:
+                z_region[:] = np.array(depth_columns).T
+                depth_buffer[local_min_y:local_max_y, local_min_x:local_max_x, 0] = Rasterizer.pack_depth(z_region, depth_mode)
+            if auxiliary:
+                ids_region[:] = np.array(ids_columns).T
+                if positions: positions_region[:] = np.array(positions_columns).transpose(1, 0, 2)
 
         print("--> Time to process raster %s seconds" % (time.time() - start_time_raster_process))
         Rasterizer.frame_buffer = frame_buffer
@@ -600,45 +1036,87 @@ class Rasterizer:
         start_time_sample_prep = time.time()
 
         ##!! For optimization purposes
-        size_y = Rasterizer.height
         sampling = Rasterizer.sampling
         sampling_square = sampling ** 2
         frame_buffer = Rasterizer.frame_buffer
-        gpu_instance = Rasterizer.gpu_instance
-        frame_buffer_len = len(frame_buffer)
-        sampled_size_x = Rasterizer.width * sampling
+        resolved = Rasterizer.resolved
         sampled_size_y = Rasterizer.height * sampling
 
+        # Sem regiões sujas (modo incremental) resolve a janela inteira, cortada pelo scissor;
+        # as regiões estão em pixels da imagem inteira e passam para posições nos buffers
+        limits = Rasterizer.limits()
+        regions = Rasterizer.regions
+        if regions is None: regions = [limits]
+        x, y = Rasterizer.origin
+        regions = [(max(min_x, limits[0]) - x, max(min_y, limits[1]) - y, min(max_x, limits[2]) - x, min(max_y, limits[3]) - y)
+                   for min_x, min_y, max_x, max_y in regions]
+        regions = [region for region in regions if region[0] < region[2] and region[1] < region[3]]
+
         print("--> Time to prep sampling %s seconds" % (time.time() - start_time_sample_prep))
         start_time_sampling_process = time.time()
         
-        for x in range(0, sampled_size_x, sampling):
-            x_offset = x * sampled_size_y
-            
-            for y in range(size_y):
-                y_offset = x_offset + y * sampling
-                r_mean = 0
-                g_mean = 0
-                b_mean = 0
-                
-                for i in range(sampling):
-                    offset_x = i * sampled_size_y + y_offset
-
-                    for j in range(sampling):
-                        offset = offset_x + j
-                        
-                        if offset == frame_buffer_len: break
-                        color = frame_buffer[offset]
-                        r_mean += color[0]
-                        g_mean += color[1]
-                        b_mean += color[2]
-
-                if r_mean > 0 or g_mean > 0 or b_mean > 0:
-                    r_mean /= sampling_square
-                    g_mean /= sampling_square
-                    b_mean /= sampling_square
-
-                    gpu_instance.draw_pixels([int(x / sampling), y], gpu_instance.RGB8, [r_mean, g_mean, b_mean])
+        for min_x, min_y, max_x, max_y in regions:
+            # Subamostras da região em um array (o frame_buffer é guardado coluna a coluna),
+            # resolvidas com operações do NumPy no lugar dos laços por pixel
+            start, end = min_y * sampling, max_y * sampling
+            columns = [frame_buffer[x * sampled_size_y + start:x * sampled_size_y + end]
+                       for x in range(min_x * sampling, max_x * sampling)]
+            try:
+                samples = np.array(columns, dtype=np.float64)
+            except ValueError:  # cores de tamanhos diferentes (ex.: RGBA das texturas)
+                samples = np.array([[color[:3] for color in column] for column in columns], dtype=np.float64)
+            samples = samples[:, :, :3].reshape(max_x - min_x, sampling, max_y - min_y, sampling, 3)
+
+            # Soma na mesma ordem do laço por pixel (subcolunas i, depois sublinhas j)
+            total = 0
+            for i in range(sampling):
+                for j in range(sampling):
+                    total = total + samples[:, i, :, j]
+
+            region = np.zeros(total.shape, dtype=resolved.dtype)
+            lit = (total > 0).any(axis=2)
+            region[lit] = total[lit] / sampling_square
+            resolved[min_y:max_y, min_x:max_x] = region.transpose(1, 0, 2)
+
+        # Copia a imagem resolvida (que guarda também as regiões não redesenhadas) para a
+        # GPU, só nos pixels acesos, como os desenhos 2D feitos direto na GPU são mantidos
+        lit = resolved.any(axis=2)
+        Rasterizer.gpu_instance.draw_masked(lit, Rasterizer.gpu_instance.RGB8, resolved[lit])
         
         print("--> Time to process sampling %s seconds" % (time.time() - start_time_sampling_process))
         print("!!! Time to sample: %s seconds !!!\n" % (time.time() - start_time_sample))
+
+    @staticmethod
+    def resolve_auxiliary(planes):
+        # Resolve os planos auxiliares do quadro exibido para a resolução da imagem, nos
+        # arrays de planes ("depth", "id" e "position", este só se as posições são guardadas),
+        # que podem ser arquivos mapeados em memória. Cada pixel usa a subamostra mais
+        # próxima da câmera (médias não fazem sentido para ids); sem nada desenhado a
+        # profundidade fica 1.0, o id 0 e a posição NaN.
+        gpu = Rasterizer.gpu_instance
+        sampling = Rasterizer.sampling
+        height, width = Rasterizer.height, Rasterizer.width
+
+        def pixels(samples):  # (altura, largura, subamostras, ...) das subamostras
+            shape = samples.shape[2:]
+            samples = samples.reshape((height, sampling, width, sampling) + shape)
+            return samples.swapaxes(1, 2).reshape((height, width, sampling ** 2) + shape)
+
+        depth = gpu.get_depth_buffer()
+        mode = gpu.depth_mode(depth)
+        depth = pixels(depth[:, :, 0])
+        nearest = depth.argmin(axis=2)[:, :, np.newaxis]
+        depth = np.take_along_axis(depth, nearest, axis=2)[:, :, 0]
+        background = depth == gpu.depth_value(gpu.clear_depth_val, mode)
+
+        planes["depth"][:] = gpu.depth_from_value(depth, mode)
+        planes["depth"][background] = 1.0
+
+        ids = np.take_along_axis(pixels(Rasterizer.object_ids), nearest, axis=2)[:, :, 0]
+        planes["id"][:] = ids
+        planes["id"][background] = 0
+
+        if "position" in planes:
+            positions = pixels(Rasterizer.positions)
+            planes["position"][:] = np.take_along_axis(positions, nearest[:, :, :, np.newaxis], axis=2)[:, :, 0]
+            planes["position"][background] = np.nan
@@ -17,9 +17,20 @@ import xml.etree.ElementTree
 # Outras
 import re
 import math
+import array
+
+# Numpy
+import numpy as np
 
 # Métodos de Apoio
 
+class MFArray(np.ndarray):
+    """Array NumPy contíguo que pode ser usado no lugar da lista de um campo MF*."""
+
+    def __bool__(self):
+        """Como nas listas, o campo é verdadeiro se possuir algum valor."""
+        return self.size > 0
+
 def clean(child):
     """Recebe um nó XML e remove dele o namespace do atributo tag se houver."""
     _, _, child.tag = child.tag.rpartition('}') # remove os namespaces
@@ -39,6 +50,15 @@ def get_colors(appearance):
         colors["shininess"] = appearance.material.shininess
     return colors
 
+def same_value(value, other):
+    """Método de apoio para comparar valores de campos (números, listas ou arrays)."""
+    if value is other:
+        return True
+    try:
+        return bool(np.array_equal(value, other))
+    except (TypeError, ValueError):
+        return False
+
 
 # Leitores de Campos X3D
 
@@ -60,8 +80,8 @@ def MFFloat(node, field, default):
         val = node.attrib[field].strip()
         if val:
             val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
-        return []
+            return np.array(val_str, dtype=np.float64).view(MFArray)
+        return np.empty(0, dtype=np.float64).view(MFArray)
     return default
 
 def MFInt32(node, field, default):
@@ -70,8 +90,8 @@ def MFInt32(node, field, default):
         val = node.attrib[field].strip()
         if val:
             val_str = re.split(r'[,\s]\s*', val)
-            return [int(value) for value in val_str]
-        return []
+            return np.array(val_str, dtype=np.int32).view(MFArray)
+        return np.empty(0, dtype=np.int32).view(MFArray)
     return default
 
 def SFBool(node, field, default):
@@ -107,8 +127,8 @@ def MFColor(node, field, default):
         val = node.attrib[field].strip()
         if val:
             val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
-        return []
+            return np.array(val_str, dtype=np.float64).view(MFArray)
+        return np.empty(0, dtype=np.float64).view(MFArray)
     return default
 
 def SFVec3f(node, field, default):
@@ -127,8 +147,8 @@ def MFVec3f(node, field, default):
         val = node.attrib[field].strip()
         if val:
             val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
-        return []
+            return np.array(val_str, dtype=np.float64).view(MFArray)
+        return np.empty(0, dtype=np.float64).view(MFArray)
     return default
 
 def MFVec2f(node, field, default):
@@ -137,8 +157,8 @@ def MFVec2f(node, field, default):
         val = node.attrib[field].strip()
         if val:
             val_str = re.split(r'[,\s]\s*', val)
-            return [float(value) for value in val_str]
-        return []
+            return np.array(val_str, dtype=np.float64).view(MFArray)
+        return np.empty(0, dtype=np.float64).view(MFArray)
     return default
 
 def SFString(node, field, default):
@@ -154,6 +174,25 @@ def MFString(node, field, default):
         return [addr.replace('"', '').replace("'", '') for addr in val_str if addr != '']
     return default
 
+def draw(command):
+    """Executa a chamada de renderização (função e argumentos) montada por um lower()."""
+    if command:
+        function, kwargs = command
+        function(**kwargs)
+
+def build(child, node_class):
+    """Recupera o nó já montado (USE ou carregador incremental) ou monta ele a partir do XML."""
+    if "USE" in child.attrib:  # instância compartilha o mesmo nó (e buffers) do DEF
+        name = child.attrib["USE"].strip()
+        if name not in X3DNode.named_nodes:
+            raise Exception("Nó {0} usado (USE) antes de ser definido (DEF).".format(name))
+        return X3DNode.named_nodes[name]
+
+    built = X3D.built.pop(child, None)
+    if built is None:
+        built = node_class(child)
+    return built
+
 def MFNode(node, name, default):
     """Especifica zero ou mais nós X3D."""
     children = default
@@ -162,9 +201,9 @@ def MFNode(node, name, default):
         clean(child) # remove namespace
         if name == "X3DChildNode":
             if child.tag == "Shape":
-                children.append(Shape(child))
+                children.append(build(child, Shape))
             elif child.tag == "Transform":
-                children.append(Transform(child))
+                children.append(build(child, Transform))
 
     return children
 
@@ -174,43 +213,43 @@ def SFNode(node, name, default):
         clean(child) # remove namespace
         if name == "X3DAppearanceNode":
             if child.tag == "Appearance":
-                appearance = Appearance(child)
+                appearance = build(child, Appearance)
                 X3D.current_appearance = appearance
                 return appearance
         elif name == "X3DGeometryNode":
             if child.tag == "Polypoint2D":
-                return Polypoint2D(child)
+                return build(child, Polypoint2D)
             if child.tag == "Polyline2D":
-                return Polyline2D(child)
+                return build(child, Polyline2D)
             if child.tag == "TriangleSet2D":
-                return TriangleSet2D(child)
+                return build(child, TriangleSet2D)
             if child.tag == "TriangleSet":
-                return TriangleSet(child)
+                return build(child, TriangleSet)
             if child.tag == "TriangleStripSet":
-                return TriangleStripSet(child)
+                return build(child, TriangleStripSet)
             if child.tag == "IndexedTriangleStripSet":
-                return IndexedTriangleStripSet(child)
+                return build(child, IndexedTriangleStripSet)
             if child.tag == "Box":
-                return Box(child)
+                return build(child, Box)
             if child.tag == "Sphere":
-                return Sphere(child)
+                return build(child, Sphere)
             if child.tag == "IndexedFaceSet":
-                return IndexedFaceSet(child)
+                return build(child, IndexedFaceSet)
         elif name == "X3DMaterialNode":
             if child.tag == "Material":
-                return Material(child)
+                return build(child, Material)
         elif name == "X3DTextureNode":
             if child.tag == "ImageTexture":
-                return ImageTexture(child)
+                return build(child, ImageTexture)
         elif name == "X3DCoordinateNode":
             if child.tag == "Coordinate":
-                return Coordinate(child)
+                return build(child, Coordinate)
         elif name == "X3DColorNode":
             if child.tag == "Color":
-                return Color(child)
+                return build(child, Color)
         elif name == "X3DTextureCoordinateNode":
             if child.tag == "TextureCoordinate":
-                return TextureCoordinate(child)
+                return build(child, TextureCoordinate)
 
     return default
 
@@ -225,8 +264,10 @@ class X3D:
 
     Atributos
     ----------
+    filename : str
+        caminho do arquivo X3D a ser lido
     root : Element
-        raiz do grafo de cena X3D em XMl
+        raiz do grafo de cena X3D em XMl (esvaziada conforme a leitura incremental avança)
     width : int
         largura tela que será renderizada (deprecated)
     height : int
@@ -238,11 +279,13 @@ class X3D:
          sistema de preview para geometrias 2D simples
     render : {} (static)
         dicionario dos métodos de renderização
+    built : {} (static)
+        nós X3D já montados pelo carregador incremental, indexados pelo elemento XML
 
     Métodos
     -------
     parse():
-        Realiza o parse e já realiza as rotinas de renderização.
+        Realiza o parse incremental (iterparse) montando os nós conforme os elementos fecham.
     """
 
     current_color = {  # controle de cor instantânea
@@ -253,13 +296,20 @@ class X3D:
     current_texture = []  # controle de texturas instantâneas
     preview = None  # atributo que aponta para o sistema de preview
     renderer = {}  # dicionario dos métodos de renderização
+    built = {}  # nós montados durante a leitura incremental e ainda não consumidos
+    now = None  # instante (s) do quadro sendo renderizado, None usa o relógio do sistema
+    current_object = 0  # id (ver RenderList.object_ids) do objeto sendo desenhado
+
+    streamed = ("Shape", "Transform")  # elementos montados assim que fecham na leitura
 
     def __init__(self, filename):
-        """Constroi o atributo para a raiz do grafo X3D."""
-        self.root = xml.etree.ElementTree.parse(filename).getroot()
+        """Guarda o arquivo X3D, a leitura só acontece no parse()."""
+        self.filename = filename
+        self.root = None  # raiz do XML, preenchida durante o parse()
         self.width = 60  # Valor padrão de largura da tela
         self.height = 40  # Valor padrão de altura da tela
         self.scene = None  # Referência para o objeto da cena
+        self.commands = None  # Lista de comandos compilada a partir da cena
 
     def set_preview(self, preview):
         """Armazena as rotinas para fazer o render da cena."""
@@ -271,19 +321,55 @@ class X3D:
         self.height = height
 
     def parse(self):
-        """Leitura da cena começando da raiz do X3D."""
-        for child in self.root:
-            clean(child) # remove namespace
-            if child.tag == "Scene":
-                self.scene = Scene(child)
-
-    def render(self):
-        """Renderização da cena começando da raiz do X3D."""
-        self.scene.render()
+        """Leitura incremental da cena começando da raiz do X3D."""
+        # Em vez de carregar todo o DOM para depois montar os nós, os elementos são lidos
+        # com iterparse. Cada Shape ou Transform vira um nó X3D assim que o seu elemento
+        # fecha e o XML consumido é apagado, assim o pico de memória fica próximo ao das
+        # geometrias montadas e não ao do DOM inteiro somado a elas.
+        classes = {"Shape": Shape, "Transform": Transform}
+        X3D.built = {}
+        depth = 0
+
+        for event, element in xml.etree.ElementTree.iterparse(self.filename,
+                                                              events=("start", "end")):
+            if event == "start":
+                clean(element)  # remove namespace
+                if self.root is None:
+                    self.root = element
+                depth += 1
+                continue
+
+            depth -= 1
+            if element.tag in X3D.streamed:
+                X3D.built[element] = build(element, classes[element.tag])
+                element.clear()  # libera atributos e filhos já consumidos
+            elif element.tag == "Scene" and depth == 1:
+                self.scene = Scene(element)
+                element.clear()
+            elif depth == 1:
+                element.clear()  # outros elementos da raiz (head, meta, ...) não são usados
+
+        X3D.built.clear()
+
+    def idle(self):
+        """Se o último quadro ainda vale: sem TimeSensor na cena e nenhum campo alterado."""
+        # O TimeSensor do GL não para ao fim do ciclo, então qualquer um mantém a animação.
+        if self.commands is None:
+            return False
+        return not self.commands.events.sensors and self.commands.changes == X3DNode.changes
+
+    def render(self, timestamp=None):
+        """Renderização da cena repetindo a lista de comandos compilada do grafo."""
+        X3D.now = timestamp  # os TimeSensors geram eventos para esse instante
+        if self.commands is None:
+            self.commands = RenderList(self.scene)
+        self.commands.render()
 
 class Scene:
     """O nó Scene acomoda a cena X3D."""
 
+    __slots__ = ("children",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         self.children = []
@@ -295,25 +381,25 @@ class Scene:
         for child in node:
             clean(child)  # remove namespace
             if child.tag == "Transform":
-                self.children.append(Transform(child))
+                self.children.append(build(child, Transform))
             elif child.tag == "TimeSensor":
-                self.children.append(TimeSensor(child))
+                self.children.append(build(child, TimeSensor))
             elif child.tag == "SplinePositionInterpolator":
-                self.children.append(SplinePositionInterpolator(child))
+                self.children.append(build(child, SplinePositionInterpolator))
             elif child.tag == "OrientationInterpolator":
-                self.children.append(OrientationInterpolator(child))
+                self.children.append(build(child, OrientationInterpolator))
             elif child.tag == "ROUTE":
-                self.children.append(ROUTE(child))
+                self.children.append(build(child, ROUTE))
             elif child.tag == "DirectionalLight":
-                lights.append(DirectionalLight(child))
+                lights.append(build(child, DirectionalLight))
             elif child.tag == "PointLight":
-                lights.append(PointLight(child))
+                lights.append(build(child, PointLight))
             elif child.tag == "Viewpoint":
-                viewpoint = Viewpoint(child)
+                viewpoint = build(child, Viewpoint)
             elif child.tag == "NavigationInfo":
-                navigation_info = NavigationInfo(child)
+                navigation_info = build(child, NavigationInfo)
             elif child.tag == "Fog":
-                fog = Fog(child)
+                fog = build(child, Fog)
 
         self.children = lights + self.children  # deixa luzes primeiro
 
@@ -335,15 +421,206 @@ class Scene:
         for child in self.children:
             child.render()
 
+class EventGraph:
+    """Grafo de eventos dos ROUTEs, em ordem topológica, com propagação incremental."""
+
+    def __init__(self, routes, processors):
+        """Monta o grafo a partir dos ROUTEs e ordena os nós pelas dependências."""
+        # Cada nó é um vértice e cada ROUTE uma aresta do nó de origem para o de destino.
+        # Com a ordem topológica um nó só é avaliado depois de todos os que o alimentam,
+        # assim a cascata se resolve em uma única passada no mesmo quadro.
+        self.routes = {}  # id do nó de origem -> ROUTEs que saem dele
+        self.sensors = [node for node in processors if isinstance(node, X3DSensorNode)]
+        self.first = True  # no primeiro quadro tudo é avaliado e propagado
+
+        nodes = {id(node): node for node in processors}
+        inputs = {id(node): 0 for node in processors}
+        targets = {}
+        for route in routes:
+            source = X3DNode.named_nodes[route.fromNode]
+            target = X3DNode.named_nodes[route.toNode]
+            for node in (source, target):
+                nodes.setdefault(id(node), node)
+                inputs.setdefault(id(node), 0)
+            self.routes.setdefault(id(source), []).append(route)
+            targets.setdefault(id(source), []).append(target)
+            inputs[id(target)] += 1
+
+        # Algoritmo de Kahn, mantendo a ordem do documento entre nós independentes
+        self.order = []
+        ready = [node for key, node in nodes.items() if inputs[key] == 0]
+        while ready:
+            node = ready.pop(0)
+            self.order.append(node)
+            for target in targets.get(id(node), ()):
+                inputs[id(target)] -= 1
+                if inputs[id(target)] == 0:
+                    ready.append(target)
+
+        if len(self.order) < len(nodes):  # ciclo: o resto fica na ordem em que apareceu
+            print("ROUTEs com ciclo, eventos do ciclo avaliados na ordem do documento")
+            ordered = set(map(id, self.order))
+            self.order += [node for key, node in nodes.items() if key not in ordered]
+
+    def cascade(self):
+        """Propaga os eventos do quadro e retorna os nós que tiveram campos alterados."""
+        # Sensores geram eventos todo quadro. Um interpolador só é avaliado se alguma
+        # entrada mudou, e um ROUTE só propaga a partir de nós que mudaram; o ROUTE ainda
+        # ignora valores iguais aos do destino, o que suja as matrizes (versão do nó) e
+        # recompila os Shapes só quando preciso.
+        changed = {}
+        for node in self.order:
+            fired = self.first or isinstance(node, X3DSensorNode) or id(node) in changed
+            if not fired:
+                continue
+            if isinstance(node, (TimeSensor, X3DInterpolatorNode)):
+                node.render()
+            for route in self.routes.get(id(node), ()):
+                if route.render():
+                    target = X3DNode.named_nodes[route.toNode]
+                    changed[id(target)] = target
+
+        self.first = False
+        return changed.values()
+
+class RenderList:
+    """Lista plana de comandos de renderização compilada a partir do grafo de cena."""
+
+    # Códigos de operação guardados no array opcodes
+    NODE = 0    # operand: nó que se renderiza sozinho (luzes, viewpoint, ...)
+    PUSH = 1    # operand: (Transform, função Transform_in)
+    POP = 2     # operand: função Transform_out
+    DRAW = 3    # operand: (Shape, chamada de renderização montada pelo lower())
+    LOWER = 4   # como DRAW, mas recompila a chamada antes, pois um ROUTE alterou um nó usado
+
+    def __init__(self, scene):
+        """Compila a cena em uma sequência de comandos (opcodes) e seus operandos."""
+        # O traversal do grafo acontece uma única vez aqui. Cada quadro só percorre a
+        # lista (RenderList.render), assim o custo por quadro não depende da profundidade
+        # do grafo, e as cores e argumentos das geometrias já ficam montados.
+        self.opcodes = array.array("b")
+        self.operands = []
+        self.lowered = {}  # id de cada nó usado em um DRAW -> posições desses DRAW
+        self.routes = []  # ROUTEs e nós de eventos (sensores e interpoladores) vão para o
+        self.processors = []  # grafo de eventos, avaliado antes dos comandos a cada quadro
+        self.changes = None  # X3DNode.changes depois da cascata do último quadro
+        self.objects = {}  # posição de cada DRAW -> id do objeto desenhado
+        self.object_ids = {}  # nome (DEF) do objeto -> id, de 1 em diante na ordem da cena
+        self.path = []  # DEFs dos Transforms em que a compilação está
+
+        for child in scene.children:
+            self.compile(child)
+        self.events = EventGraph(self.routes, self.processors)
+
+    def emit(self, opcode, operand):
+        """Acrescenta um comando na lista."""
+        self.opcodes.append(opcode)
+        self.operands.append(operand)
+        return len(self.opcodes) - 1
+
+    def compile(self, node):
+        """Converte o nó (e seus filhos) em comandos."""
+        if isinstance(node, Transform):
+            if not all(func in X3D.renderer for func in ("Transform_in", "Transform_out")):
+                raise Exception("Transform(s) não foram implementados.")
+            self.emit(RenderList.PUSH, (node, X3D.renderer["Transform_in"]))
+            self.path.append(getattr(node, "name", None))
+            for child in node.children:
+                self.compile(child)
+            self.path.pop()
+            self.emit(RenderList.POP, X3D.renderer["Transform_out"])
+        elif isinstance(node, Shape):
+            if node.appearance:
+                node.appearance.render()  # mantém o estado global como em um traversal
+            index = self.emit(RenderList.DRAW, (node, self.lower(node)))
+            self.objects[index] = self.object_id(node)
+            for used in self.dependencies(node):
+                self.lowered.setdefault(id(used), []).append(index)
+        elif isinstance(node, ROUTE):
+            self.routes.append(node)
+        elif isinstance(node, (TimeSensor, X3DInterpolatorNode)):
+            self.processors.append(node)
+        else:
+            self.emit(RenderList.NODE, node)
+
+    def object_id(self, shape):
+        """Id do objeto de um Shape, pelo DEF do Shape, da geometria ou do Transform mais próximo."""
+        # O DEF das coordenadas da geometria também vale (ex.: letras que só nomeiam o
+        # Coordinate); Shapes sem nenhum DEF no caminho ficam todos com o nome vazio
+        names = [getattr(shape, "name", None), getattr(shape.geometry, "name", None),
+                 getattr(getattr(shape.geometry, "coord", None), "name", None)]
+        name = next((name for name in names + self.path[::-1] if name), "")
+        return self.object_ids.setdefault(name, len(self.object_ids) + 1)
+
+    @staticmethod
+    def lower(shape):
+        """Monta a chamada de renderização da geometria de um Shape."""
+        if shape.geometry:
+            return shape.geometry.lower(shape.appearance)
+        return None
+
+    @staticmethod
+    def dependencies(shape):
+        """Nós dos quais a chamada montada para o Shape depende."""
+        used = [shape, shape.appearance, shape.geometry]
+        if shape.appearance:
+            used += [shape.appearance.material, shape.appearance.texture]
+        for field in ("coord", "color", "texCoord"):
+            used.append(getattr(shape.geometry, field, None))
+        return [node for node in used if isinstance(node, X3DNode)]
+
+    def render(self):
+        """Executa os comandos compilados."""
+        # Cascata de eventos antes de desenhar, assim o quadro já mostra os valores novos
+        for node in self.events.cascade():
+            for position in self.lowered.get(id(node), ()):
+                self.opcodes[position] = RenderList.LOWER
+        self.changes = X3DNode.changes
+
+        operands = self.operands
+        for index, opcode in enumerate(self.opcodes):
+            operand = operands[index]
+            if opcode == RenderList.DRAW:
+                shape, command = operand
+                if shape.appearance:
+                    shape.appearance.render()
+                X3D.current_object = self.objects[index]
+                draw(command)
+            elif opcode == RenderList.PUSH:
+                transform, transform_in = operand
+                transform_in(translation=transform.translation,
+                             scale=transform.scale,
+                             rotation=transform.rotation,
+                             node=transform)
+            elif opcode == RenderList.POP:
+                operand()  # Tira a transformação da pilha
+            elif opcode == RenderList.NODE:
+                operand.render()
+            elif opcode == RenderList.LOWER:
+                shape, _ = operand
+                if shape.appearance:
+                    shape.appearance.render()
+                command = self.lower(shape)
+                operands[index] = (shape, command)
+                self.opcodes[index] = RenderList.DRAW
+                X3D.current_object = self.objects[index]
+                draw(command)
+
 # Core component
 
 class X3DNode:
     """Nó abstrato que é o tipo base para todos os nós no sistema X3D."""
 
+    # Os nós usam __slots__ em vez de __dict__ para ocupar menos memória e acelerar o acesso
+    # aos campos no traversal, cada classe declara só os campos que ela própria define.
+    __slots__ = ("name", "version")
+
     named_nodes = {}  # Dicionário com todos os nós X3D nomeados
+    changes = 0  # Total de campos alterados por ROUTE, para saber se a cena mudou
 
     def __init__(self, node=None):
         """Parse do nó X3D."""
+        self.version = 0  # incrementa quando um campo é alterado por ROUTE
         if node is not None and "DEF" in node.attrib:
             self.name = node.attrib["DEF"].strip()
             X3DNode.named_nodes[self.name] = self
@@ -351,6 +628,8 @@ class X3DNode:
 class X3DChildNode(X3DNode):
     """Nó abstrato como base para campos children, addChildren, and removeChildren."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -359,6 +638,8 @@ class X3DChildNode(X3DNode):
 class X3DBindableNode(X3DChildNode):
     """X3DBindableNode é o tipo base abstrato para certos tipos de objetos."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -367,6 +648,8 @@ class X3DBindableNode(X3DChildNode):
 class X3DSensorNode(X3DChildNode):
     """X3DSensorNode é o tipo base abstrato para todos tipos de sensores."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -377,6 +660,8 @@ class X3DSensorNode(X3DChildNode):
 class X3DTimeDependentNode(X3DChildNode):
     """Nó abstrato que todos os tipos que dependem de tempo derivam."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -385,6 +670,8 @@ class X3DTimeDependentNode(X3DChildNode):
 class TimeSensor(X3DTimeDependentNode, X3DSensorNode):
     """Gera eventos conforme o tempo passa."""
 
+    __slots__ = ("cycleInterval", "loop", "fraction_changed")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -399,7 +686,8 @@ class TimeSensor(X3DTimeDependentNode, X3DSensorNode):
 
         # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
         self.fraction_changed = X3D.renderer["TimeSensor"](cycleInterval=self.cycleInterval,
-                                                           loop=self.loop)
+                                                           loop=self.loop,
+                                                           timestamp=X3D.now)
 
 
 # Grouping component
@@ -407,6 +695,8 @@ class TimeSensor(X3DTimeDependentNode, X3DSensorNode):
 class X3DGroupingNode(X3DChildNode):
     """Nó abstrato indica que os tipos de nós concretos derivados dele contêm nós filhos."""
 
+    __slots__ = ("children", "bboxCenter", "bboxSize")
+
     def __init__(self, node=None):
         """Parse do nó X3d."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -420,6 +710,8 @@ class X3DGroupingNode(X3DChildNode):
 class Transform(X3DGroupingNode):
     """Nó de agrupamento que define um sistema de coordenadas para seus nós filhos."""
 
+    __slots__ = ("rotation", "scale", "translation", "center", "scaleOrientation")
+
     def __init__(self, node):
         """Parse do nó X3d."""
         super().__init__(node) # Chama construtor da classe pai
@@ -437,7 +729,8 @@ class Transform(X3DGroupingNode):
         # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
         X3D.renderer["Transform_in"](translation=self.translation,
                                      scale=self.scale,
-                                     rotation=self.rotation)
+                                     rotation=self.rotation,
+                                     node=self)
 
         for child in self.children:
             child.render()
@@ -450,6 +743,8 @@ class Transform(X3DGroupingNode):
 class X3DShapeNode(X3DChildNode):
     """Este é o tipo de nó base para todos os nós do tipo Shape."""
 
+    __slots__ = ("appearance", "geometry")
+
     def __init__(self, node=None):
         """Parse do nó X3d."""
         super().__init__(node) # Chama construtor da classe pai
@@ -459,6 +754,8 @@ class X3DShapeNode(X3DChildNode):
 class X3DAppearanceNode(X3DNode):
     """Este é o tipo de nó básico para todos os nós do tipo Appearance."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -467,6 +764,8 @@ class X3DAppearanceNode(X3DNode):
 class X3DAppearanceChildNode(X3DNode):
     """Este é o tipo de nó básico para todos os nós do tipo X3DAppearanceNode."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -475,6 +774,8 @@ class X3DAppearanceChildNode(X3DNode):
 class X3DMaterialNode(X3DAppearanceChildNode):
     """Este é o tipo de nó básico para todos os nós do tipo Material."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -483,6 +784,9 @@ class X3DMaterialNode(X3DAppearanceChildNode):
 class Material(X3DMaterialNode):
     """Especifica propriedades do material de superfícies para nós de geometria associados."""
 
+    __slots__ = ("ambientIntensity", "diffuseColor", "emissiveColor", "shininess",
+                 "specularColor", "transparency")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -504,6 +808,8 @@ class Material(X3DMaterialNode):
 class X3DTextureNode(X3DAppearanceChildNode):
     """Nó abstrato base para todos os tipos de nó que especificam imagens de textura."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -512,6 +818,8 @@ class X3DTextureNode(X3DAppearanceChildNode):
 class X3DTexture2DNode(X3DTextureNode):
     """Nó abstrato base para todos os tipos de nó que especificam imagens 2D de textura."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -520,6 +828,8 @@ class X3DTexture2DNode(X3DTextureNode):
 class ImageTexture(X3DTexture2DNode):
     """Define mapa de textura para um arquivo de imagem e parâmetros gerais de mapeamento."""
 
+    __slots__ = ("url", "repeatS", "repeatT")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -534,6 +844,9 @@ class ImageTexture(X3DTexture2DNode):
 class Appearance(X3DAppearanceNode):
     """Especifica as propriedades visuais da geometria."""
 
+    __slots__ = ("fillProperties", "lineProperties", "material", "shaders", "texture",
+                 "textureTransform")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -555,6 +868,8 @@ class Appearance(X3DAppearanceNode):
 class Shape(X3DShapeNode):
     """Define aparência e geometria, que são usados para criar objetos renderizados."""
 
+    __slots__ = ()
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -571,6 +886,8 @@ class Shape(X3DShapeNode):
 class X3DGeometryNode(X3DNode):
     """Este é o tipo de nó base para todas as geometrias em X3D."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -579,6 +896,9 @@ class X3DGeometryNode(X3DNode):
 class X3DComposedGeometryNode(X3DGeometryNode):
     """Este é o tipo de nó base para toda a geometria 3D composta em X3D."""
 
+    __slots__ = ("coord", "attrib", "fogCoord", "normal", "texCoord", "ccw", "colorPerVertex",
+                 "normalPerVertex", "solid")
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -596,6 +916,8 @@ class X3DComposedGeometryNode(X3DGeometryNode):
 class X3DGeometricPropertyNode(X3DNode):
     """Nó base para todos os tipos de nós de propriedades geométricas definidos no X3D."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -604,6 +926,8 @@ class X3DGeometricPropertyNode(X3DNode):
 class X3DCoordinateNode(X3DGeometricPropertyNode):
     """Nó base para todos os tipos de nós de coordenadas em X3D."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -612,6 +936,8 @@ class X3DCoordinateNode(X3DGeometricPropertyNode):
 class X3DColorNode(X3DGeometricPropertyNode):
     """Nó básico para especificações de cores no X3D."""
 
+    __slots__ = ()
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -620,6 +946,8 @@ class X3DColorNode(X3DGeometricPropertyNode):
 class Coordinate(X3DCoordinateNode):
     """Define um conjunto de coordenadas 3D para nós de geometria baseada em vértices."""
 
+    __slots__ = ("point",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -629,6 +957,8 @@ class Coordinate(X3DCoordinateNode):
 class Color(X3DColorNode):
     """Define um conjunto de cores RGB a serem usadas nos campos de outro nó."""
 
+    __slots__ = ("color",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -638,6 +968,8 @@ class Color(X3DColorNode):
 class TriangleSet(X3DComposedGeometryNode):
     """Representa uma forma 3D que representa uma coleção de triângulos individuais."""
 
+    __slots__ = ("vertices",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -646,19 +978,25 @@ class TriangleSet(X3DComposedGeometryNode):
         # Preview
         # Implemente se desejar
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "TriangleSet" not in X3D.renderer:
             raise Exception("TriangleSet não foi implementado.")
 
         colors = get_colors(appearance)
         if self.coord and self.coord.point:
             # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
-            X3D.renderer["TriangleSet"](point=self.coord.point, colors=colors)
+            return X3D.renderer["TriangleSet"], dict(point=self.coord.point, colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 class TriangleStripSet(X3DComposedGeometryNode):
     """Representa uma forma 3D composta por faixas de triângulos."""
 
+    __slots__ = ("stripCount",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -667,21 +1005,27 @@ class TriangleStripSet(X3DComposedGeometryNode):
         # Preview
         # Implemente se desejar
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "TriangleStripSet" not in X3D.renderer:
             raise Exception("TriangleStripSet não foi implementado.")
 
         colors = get_colors(appearance)
         if self.coord and self.coord.point and self.stripCount:
             # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
-            X3D.renderer["TriangleStripSet"](point=self.coord.point,
-                                             stripCount=self.stripCount,
-                                             colors=colors)
+            return X3D.renderer["TriangleStripSet"], dict(point=self.coord.point,
+                                                          stripCount=self.stripCount,
+                                                          colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 class IndexedTriangleStripSet(X3DComposedGeometryNode):
     """Representa uma forma 3D composta de tiras de triângulos."""
 
+    __slots__ = ("index",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -690,8 +1034,8 @@ class IndexedTriangleStripSet(X3DComposedGeometryNode):
         # Preview
         # Implemente se desejar
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "IndexedTriangleStripSet" not in X3D.renderer:
             raise Exception("IndexedTriangleStripSet não foi implementado.")
 
@@ -699,9 +1043,13 @@ class IndexedTriangleStripSet(X3DComposedGeometryNode):
         if "IndexedTriangleStripSet" in X3D.renderer:
             if self.coord and self.coord.point and self.index:
                 # NO FUTURO MANDAR O OBJETO INTEIRO COM SEUS PARAMETROS ENCAPSULADOS
-                X3D.renderer["IndexedTriangleStripSet"](point=self.coord.point,
-                                                        index=self.index,
-                                                        colors=colors)
+                return X3D.renderer["IndexedTriangleStripSet"], dict(point=self.coord.point,
+                                                                     index=self.index,
+                                                                     colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 
 # Geometry2D component
@@ -709,12 +1057,18 @@ class IndexedTriangleStripSet(X3DComposedGeometryNode):
 class Polypoint2D(X3DGeometryNode):
     """Pontos exibidos por um conjunto de vértices no sistema de coordenadas 2D."""
 
+    __slots__ = ("point",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.point = MFVec2f(node, "point", [])
 
         # Preview
+        self.add_preview()
+
+    def add_preview(self):
+        """Registra a geometria no sistema de preview, se houver um."""
         if X3D.preview:
             points = []
             for i in range(0, len(self.point), 2):
@@ -722,25 +1076,35 @@ class Polypoint2D(X3DGeometryNode):
             X3D.preview.pontos.append({'appearance': X3D.current_appearance,
                                        'points': points})
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "Polypoint2D" not in X3D.renderer:
             raise Exception("Polypoint2D não foi implementado.")
 
         colors = get_colors(appearance)
         if self.point:
-            X3D.renderer["Polypoint2D"](point=self.point, colors=colors)
+            return X3D.renderer["Polypoint2D"], dict(point=self.point, colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 
 class Polyline2D(X3DGeometryNode):
     """Série de segmentos de linha contíguos no sistema de coordenadas 2D."""
 
+    __slots__ = ("lineSegments",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.lineSegments = MFVec2f(node, "lineSegments", [])
 
         # Preview
+        self.add_preview()
+
+    def add_preview(self):
+        """Registra a geometria no sistema de preview, se houver um."""
         if X3D.preview:
             points = []
             for i in range(0, len(self.lineSegments), 2):
@@ -748,18 +1112,24 @@ class Polyline2D(X3DGeometryNode):
             X3D.preview.linhas.append({'appearance': X3D.current_appearance,
                                        'lines': points})
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "Polyline2D" not in X3D.renderer:
             raise Exception("Polyline2D não foi implementado.")
 
         colors = get_colors(appearance)
         if self.lineSegments:
-            X3D.renderer["Polyline2D"](lineSegments=self.lineSegments, colors=colors)
+            return X3D.renderer["Polyline2D"], dict(lineSegments=self.lineSegments, colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 class TriangleSet2D(X3DGeometryNode):
     """Especifica um conjunto de triângulos no sistema de coordenadas 2D local."""
 
+    __slots__ = ("vertices", "solid")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -767,6 +1137,10 @@ class TriangleSet2D(X3DGeometryNode):
         self.solid = SFBool(node, "solid", False)
 
         # Preview
+        self.add_preview()
+
+    def add_preview(self):
+        """Registra a geometria no sistema de preview, se houver um."""
         if X3D.preview:
             points = []
             for i in range(0, len(self.vertices), 2):
@@ -774,14 +1148,18 @@ class TriangleSet2D(X3DGeometryNode):
             X3D.preview.poligonos.append({'appearance': X3D.current_appearance,
                                           'vertices': points})
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "TriangleSet2D" not in X3D.renderer:
             raise Exception("TriangleSet2D não foi implementado.")
 
         colors = get_colors(appearance)
         if self.vertices:
-            X3D.renderer["TriangleSet2D"](vertices=self.vertices, colors=colors)
+            return X3D.renderer["TriangleSet2D"], dict(vertices=self.vertices, colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 
 # Navigation component
@@ -789,6 +1167,8 @@ class TriangleSet2D(X3DGeometryNode):
 class NavigationInfo(X3DBindableNode):
     """Características físicas do avatar do visualizador e do modelo de visualização."""
 
+    __slots__ = ("headlight",)
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -805,6 +1185,9 @@ class NavigationInfo(X3DBindableNode):
 class X3DViewpointNode(X3DBindableNode):
     """Define localização no sistema de coordenadas local para visualização."""
 
+    __slots__ = ("jump", "description", "retainUserOffsets", "centerOfRotation", "position",
+                 "orientation")
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node)  # Chama construtor da classe pai
@@ -818,6 +1201,8 @@ class X3DViewpointNode(X3DBindableNode):
 class Viewpoint(X3DViewpointNode):
     """Define um ponto de vista que fornece uma vista em perspectiva da cena."""
 
+    __slots__ = ("fieldOfView",)
+
     def __init__(self, node=None):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -840,42 +1225,56 @@ class Viewpoint(X3DViewpointNode):
 class Box(X3DGeometryNode):
     """Classe responsável por geometria Box, que é um paralelepípedo centro no (0,0,0)."""
 
+    __slots__ = ("size",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.size = SFVec3f(node, "size", [2, 2, 2])
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "Box" not in X3D.renderer:
             raise Exception("Box não foi implementado.")
 
         colors = get_colors(appearance)
         if self.size:
-            X3D.renderer["Box"](size=self.size, colors=colors)
+            return X3D.renderer["Box"], dict(size=self.size, colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 
 class Sphere(X3DGeometryNode):
     """Classe responsável por geometria Sphere, que é uma esfera com centro no (0,0,0)."""
 
+    __slots__ = ("radius",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
         self.radius = SFFloat(node, "radius", 1)
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "Sphere" not in X3D.renderer:
             raise Exception("Sphere não foi implementado.")
 
         colors = get_colors(appearance)
         if self.radius:
-            X3D.renderer["Sphere"](radius=self.radius, colors=colors)
+            return X3D.renderer["Sphere"], dict(radius=self.radius, colors=colors)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 
 class IndexedFaceSet(X3DComposedGeometryNode):
     """Classe responsável por geometria Indexed Face Set, que é uma malha de polígonos."""
 
+    __slots__ = ("color", "coordIndex", "colorIndex", "texCoordIndex")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -884,8 +1283,8 @@ class IndexedFaceSet(X3DComposedGeometryNode):
         self.colorIndex = MFInt32(node, "colorIndex", [])
         self.texCoordIndex = MFInt32(node, "texCoordIndex", [])
 
-    def render(self, appearance=None):
-        """Rotina de renderização."""
+    def lower(self, appearance=None):
+        """Monta a chamada de renderização (função e argumentos) se houver o que desenhar."""
         if "IndexedFaceSet" not in X3D.renderer:
             raise Exception("IndexedFaceSet não foi implementado.")
 
@@ -903,12 +1302,17 @@ class IndexedFaceSet(X3DComposedGeometryNode):
         colors = get_colors(appearance)
 
         if self.coordIndex:
-            X3D.renderer["IndexedFaceSet"](coord=ret_coord, coordIndex=self.coordIndex,
-                                           colorPerVertex=self.colorPerVertex, color=ret_color,
-                                           colorIndex=self.colorIndex, texCoord=ret_texCoord,
-                                           texCoordIndex=self.texCoordIndex,
-                                           colors=colors,
-                                           current_texture=X3D.current_texture)
+            return X3D.renderer["IndexedFaceSet"], dict(
+                coord=ret_coord, coordIndex=self.coordIndex,
+                colorPerVertex=self.colorPerVertex, color=ret_color,
+                colorIndex=self.colorIndex, texCoord=ret_texCoord,
+                texCoordIndex=self.texCoordIndex,
+                colors=colors,
+                current_texture=X3D.current_texture)
+
+    def render(self, appearance=None):
+        """Rotina de renderização."""
+        draw(self.lower(appearance))
 
 
 # Lighting component
@@ -916,6 +1320,8 @@ class IndexedFaceSet(X3DComposedGeometryNode):
 class X3DLightNode(X3DChildNode):
     """Nó abstrato base para todos os tipos de luzes."""
 
+    __slots__ = ("ambientIntensity", "color", "intensity", "on")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -928,6 +1334,8 @@ class X3DLightNode(X3DChildNode):
 class DirectionalLight(X3DLightNode):
     """Conjunto de coordenadas de textura 2D usadas por nós de geometria baseados em vértices."""
 
+    __slots__ = ("direction",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -947,6 +1355,8 @@ class DirectionalLight(X3DLightNode):
 class PointLight(X3DLightNode):
     """Conjunto de coordenadas de textura 2D usadas por nós de geometria baseados em vértices."""
 
+    __slots__ = ("location",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -968,6 +1378,8 @@ class PointLight(X3DLightNode):
 class X3DTextureCoordinateNode(X3DGeometricPropertyNode):
     """Nó abstrato base para todos os tipos de nó que especificam coordenadas de textura."""
 
+    __slots__ = ()
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -976,6 +1388,8 @@ class X3DTextureCoordinateNode(X3DGeometricPropertyNode):
 class TextureCoordinate(X3DTextureCoordinateNode):
     """Conjunto de coordenadas de textura 2D usadas por nós de geometria baseados em vértices."""
 
+    __slots__ = ("point",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -991,6 +1405,8 @@ class TextureCoordinate(X3DTextureCoordinateNode):
 class X3DFogObject():
     """Ttipo abstrato que descreve um nó que influencia a equação de iluminação de Fog."""
 
+    __slots__ = ()
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -1001,6 +1417,8 @@ class X3DFogObject():
 class Fog(X3DBindableNode, X3DFogObject):
     """Simula efeitos atmosféricos combinando objetos com a cor especificada."""
 
+    __slots__ = ("color", "fogType", "visibilityRange")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -1016,6 +1434,8 @@ class Fog(X3DBindableNode, X3DFogObject):
 class X3DInterpolatorNode(X3DChildNode):
     """Base para todos os tipos de interpoladores."""
 
+    __slots__ = ("set_fraction", "key", "keyValue", "value_changed")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -1027,6 +1447,8 @@ class X3DInterpolatorNode(X3DChildNode):
 class SplinePositionInterpolator(X3DInterpolatorNode):
     """Interpola não linearmente entre uma lista de vetores 3D."""
 
+    __slots__ = ("closed",)
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -1043,9 +1465,21 @@ class SplinePositionInterpolator(X3DInterpolatorNode):
              keyValue=self.keyValue,
              closed=self.closed)
 
+    def evaluate(self, fractions):
+        """Valores para várias frações de uma vez, um por linha (ex.: animação inteira)."""
+        if "SplinePositionInterpolator" not in X3D.renderer:
+            raise Exception("SplinePositionInterpolator não foi implementado.")
+
+        return X3D.renderer["SplinePositionInterpolator"](set_fraction=np.asarray(fractions),
+                                                          key=self.key,
+                                                          keyValue=self.keyValue,
+                                                          closed=self.closed)
+
 class OrientationInterpolator(X3DInterpolatorNode):
     """Interpola entre uma lista de valores de rotação especificados no campo keyValue."""
 
+    __slots__ = ()
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__(node) # Chama construtor da classe pai
@@ -1059,9 +1493,20 @@ class OrientationInterpolator(X3DInterpolatorNode):
                                                                      key=self.key,
                                                                      keyValue=self.keyValue)
 
+    def evaluate(self, fractions):
+        """Valores para várias frações de uma vez, um por linha (ex.: animação inteira)."""
+        if "OrientationInterpolator" not in X3D.renderer:
+            raise Exception("OrientationInterpolator não foi implementado.")
+
+        return X3D.renderer["OrientationInterpolator"](set_fraction=np.asarray(fractions),
+                                                       key=self.key,
+                                                       keyValue=self.keyValue)
+
 class ROUTE():
     """."""
 
+    __slots__ = ("fromNode", "fromField", "toNode", "toField")
+
     def __init__(self, node):
         """Parse do nó X3D."""
         super().__init__() # Chama construtor da classe pai
@@ -1075,4 +1520,10 @@ class ROUTE():
         fromNode = X3DNode.named_nodes[self.fromNode]
         value = getattr(fromNode, self.fromField)
         toNode = X3DNode.named_nodes[self.toNode]
-        setattr(toNode, self.toField, value)
\ No newline at end of file
+        if same_value(getattr(toNode, self.toField, None), value):
+            return False  # nada mudou, o nó de destino e os caches continuam valendo
+        setattr(toNode, self.toField, value)
+        toNode.version += 1  # caches que dependem do nó (ex.: matrizes) ficam sujos
+        X3DNode.changes += 1
+        return True
+
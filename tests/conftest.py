@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Configuração comum dos testes do renderizador.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+import sys          # Caminho dos módulos do renderizador
+import subprocess   # Cada renderização roda num processo próprio
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA = os.path.join(RAIZ, "renderizador")
+EXEMPLOS = os.path.join(RAIZ, "docs", "exemplos")
+
+# Os módulos do renderizador se importam pelo nome (import gpu, import utils...)
+sys.path.insert(0, PASTA)
+
+
+@pytest.fixture
+def renderizar(tmp_path):
+    """Roda o renderizador.py em modo silencioso, com as saídas em tmp_path."""
+    # Um processo por renderização: GL, GPU e Rasterizer são estáticos e o setup não pode
+    # ser refeito no mesmo processo. O stdin vazio escolhe a amostragem padrão (2x2).
+    def run(cena, *args):
+        comando = [sys.executable, os.path.join(PASTA, "renderizador.py"), "-i", str(cena), "-q"]
+        comando += [str(arg) for arg in args]
+        subprocess.run(comando, cwd=tmp_path, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE, check=True)
+        return tmp_path
+    return run
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Testes da retomada de animações interrompidas (manifesto de quadros).
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+import json         # Registros do manifesto
+
+from test_renderizador import PARADO_E_MOVEL
+
+
+def test_retomada_refaz_quadros_corrompidos(renderizar, tmp_path):
+    cena = tmp_path / "cena.x3d"
+    cena.write_text(PARADO_E_MOVEL)
+    argumentos = ("-o", "quadro.png", "-w", 60, "-h", 40, "--fps", 1, "--frames", 3, "--no-cache")
+    renderizar(cena, *argumentos)
+
+    quadros = [tmp_path / ("quadro%04d.png" % frame) for frame in range(3)]
+    originais = [quadro.read_bytes() for quadro in quadros]
+    for quadro in quadros:
+        os.utime(quadro, ns=(0, 0))  # quadros regravados na retomada ganham outro mtime
+
+    # Quadro 1 com o mesmo tamanho e um byte trocado: só o hash denuncia
+    corrompido = bytearray(originais[1])
+    corrompido[-20] ^= 0xFF
+    quadros[1].write_bytes(bytes(corrompido))
+    os.utime(quadros[1], ns=(0, 0))
+
+    renderizar(cena, *argumentos)
+
+    assert [quadro.read_bytes() for quadro in quadros] == originais
+    assert [os.stat(quadro).st_mtime_ns == 0 for quadro in quadros] == [True, False, True]
+
+    with open(tmp_path / "quadro.manifest", encoding="utf-8") as arquivo:
+        registros = [json.loads(linha) for linha in arquivo]
+    gravados = [registro["frame"] for registro in registros[1:]]
+    assert sorted(gravados[:3]) == [0, 1, 2] and gravados[3:] == [1]  # só o quadro 1 de novo
+
+
+def test_gravacao_na_hora(renderizar, tmp_path):
+    # Com --writers 0 os quadros são gravados no laço de renderização, sem o FrameSink
+    cena = tmp_path / "cena.x3d"
+    cena.write_text(PARADO_E_MOVEL)
+    for writers in (0, 2):
+        renderizar(cena, "-o", "w%d.png" % writers, "-w", 60, "-h", 40, "--fps", 1, "--frames", 3,
+                   "--writers", writers, "--no-cache")
+
+    for frame in range(3):
+        assert (tmp_path / ("w0%04d.png" % frame)).read_bytes() == (tmp_path / ("w2%04d.png" % frame)).read_bytes()
+    with open(tmp_path / "w0.manifest", encoding="utf-8") as arquivo:
+        registros = [json.loads(linha) for linha in arquivo]
+    assert [registro["frame"] for registro in registros[1:]] == [0, 1, 2]  # na ordem dos quadros
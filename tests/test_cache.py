@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Testes do cache de cenas X3D compiladas.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+
+import x3d
+import cache
+
+from test_renderizador import PARADO_E_MOVEL
+
+
+def estrutura(cena):
+    """Árvore de nós e campos (com os arrays) comparável com ==, como o cache grava."""
+    encoder = cache._Encoder()
+    return encoder.value(cena), [array.tolist() for array in encoder.arrays]
+
+
+def lida(arquivo):
+    """Cena do arquivo X3D lida pelo parse."""
+    cena = x3d.X3D(str(arquivo))
+    cena.parse()
+    return cena
+
+
+def test_ida_e_volta(tmp_path):
+    arquivo = tmp_path / "cena.x3d"
+    arquivo.write_text(PARADO_E_MOVEL)
+    original = lida(arquivo)
+    assert cache.save(original)
+    assert os.path.exists(cache.cache_path(str(arquivo)))
+
+    cena = x3d.X3D(str(arquivo))
+    assert cache.load(cena)
+    assert estrutura(cena.scene) == estrutura(original.scene)
+
+
+def test_invalidado_quando_o_x3d_muda(tmp_path):
+    arquivo = tmp_path / "cena.x3d"
+    arquivo.write_text(PARADO_E_MOVEL)
+    assert cache.save(lida(arquivo))
+
+    # Só o mtime mudou: o hash do conteúdo confere e o cache continua valendo
+    stat = os.stat(arquivo)
+    os.utime(arquivo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.load(x3d.X3D(str(arquivo)))
+
+    # Mesmo tamanho, conteúdo diferente (outra cor): o cache é descartado
+    arquivo.write_text(PARADO_E_MOVEL.replace("emissiveColor='1 0 0'", "emissiveColor='0 0 1'"))
+    os.utime(arquivo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+    assert os.path.getsize(arquivo) == stat.st_size
+    assert not cache.load(x3d.X3D(str(arquivo)))
+
+    # Regravado, volta a valer com a cena nova
+    atual = lida(arquivo)
+    assert cache.save(atual)
+    cena = x3d.X3D(str(arquivo))
+    assert cache.load(cena)
+    assert estrutura(cena.scene) == estrutura(atual.scene)
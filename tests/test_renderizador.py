@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Testes das renderizações pela linha de comando.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import os           # Para rotinas do sistema operacional
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import EXEMPLOS
+
+# Um triângulo parado e outro que passa por cima dele ao longo da animação
+PARADO_E_MOVEL = """<?xml version="1.0" encoding="UTF-8"?>
+<X3D>
+  <Scene>
+    <Viewpoint position="0 0 10"/>
+    <NavigationInfo headlight='false'/>
+    <TimeSensor DEF='relogio' cycleInterval='4' loop='true'/>
+    <SplinePositionInterpolator DEF='caminho' key='0 0.5 1' keyValue='-2 1 0  2 1 0  -2 1 0'/>
+    <Transform DEF='parado' translation='0 -1.5 0'>
+      <Shape>
+        <IndexedFaceSet coordIndex='0 1 2 -1'><Coordinate point='-1 -1 0  1 -1 0  0 1 0'/></IndexedFaceSet>
+        <Appearance><Material emissiveColor='1 0 0'/></Appearance>
+      </Shape>
+    </Transform>
+    <Transform DEF='movel'>
+      <Shape>
+        <IndexedFaceSet coordIndex='0 1 2 -1'><Coordinate point='-1 -1 0  1 -1 0  0 1 0'/></IndexedFaceSet>
+        <Appearance><Material emissiveColor='0 1 0'/></Appearance>
+      </Shape>
+    </Transform>
+    <ROUTE fromNode='relogio' fromField='fraction_changed' toNode='caminho' toField='set_fraction'/>
+    <ROUTE fromNode='caminho' fromField='value_changed' toNode='movel' toField='translation'/>
+  </Scene>
+</X3D>
+"""
+
+# O mesmo triângulo (DEF/USE) antes e depois de outro igual na mesma profundidade
+EMPATE = """<?xml version="1.0" encoding="UTF-8"?>
+<X3D>
+  <Scene>
+    <Viewpoint position="0 0 10"/>
+    <NavigationInfo headlight='false'/>
+    <Transform translation='-3 0 0'>
+      <Shape DEF='vermelho'>
+        <IndexedFaceSet coordIndex='0 1 2 -1'><Coordinate point='-1 -1 0  1 -1 0  0 1 0'/></IndexedFaceSet>
+        <Appearance><Material diffuseColor='1 0 0'/></Appearance>
+      </Shape>
+    </Transform>
+    <Transform>
+      <Shape>
+        <IndexedFaceSet coordIndex='0 1 2 -1'><Coordinate point='-1 -1 0  1 -1 0  0 1 0'/></IndexedFaceSet>
+        <Appearance><Material diffuseColor='0 1 0'/></Appearance>
+      </Shape>
+    </Transform>
+    <Transform><Shape USE='vermelho'/></Transform>
+  </Scene>
+</X3D>
+"""
+
+
+def test_ordem_de_desenho_nos_empates(renderizar, tmp_path):
+    # As instâncias de uma malha são transformadas em lote, mas desenhadas na ordem do
+    # traversal: no empate de profundidade ganha o triângulo verde, desenhado antes da cópia.
+    cena = tmp_path / "cena.x3d"
+    cena.write_text(EMPATE)
+    renderizar(cena, "-o", "empate.png", "-w", 60, "-h", 40, "--no-cache")
+    imagem = np.asarray(Image.open(tmp_path / "empate000.png"))
+    assert imagem[22, 30, 1] == 255 and imagem[22, 30, 0] == 0
+
+
+def test_planos_auxiliares_com_um_buffer(renderizar, tmp_path):
+    # Com --buffers 1 o pre() apaga o único DEPTH_ATTACHMENT antes de cada quadro
+    # incremental; os planos auxiliares têm de ser os mesmos do double buffering.
+    cena = tmp_path / "cena.x3d"
+    cena.write_text(PARADO_E_MOVEL)
+    for buffers in (1, 2):
+        (tmp_path / str(buffers)).mkdir()
+        renderizar(cena, "-o", "%d/quadro.png" % buffers, "-w", 60, "-h", 40, "--fps", 1, "--frames", 3,
+                   "--aux", "--buffers", buffers)
+
+    for frame in range(3):
+        for plano in ("depth", "id"):
+            um = np.load(tmp_path / "1" / ("quadro_%s%04d.npy" % (plano, frame)))
+            dois = np.load(tmp_path / "2" / ("quadro_%s%04d.npy" % (plano, frame)))
+            assert np.array_equal(um, dois), (frame, plano)
+        ids = np.load(tmp_path / "1" / ("quadro_id%04d.npy" % frame))
+        assert set(np.unique(ids)) == {0, 1, 2}  # o triângulo parado continua nos planos
+
+
+# Cenas de exemplo sem animação, com iluminação e com texturas (mipmaps)
+ESTATICAS = [os.path.join(EXEMPLOS, "3D", "iluminacao", "esferas.x3d"),
+             os.path.join(EXEMPLOS, "3D", "texturas", "texturas.x3d")]
+
+
+def imagem(pasta, nome):
+    return np.asarray(Image.open(pasta / nome))
+
+
+@pytest.mark.parametrize("cena", ESTATICAS)
+def test_faixas_iguais_a_imagem_inteira(renderizar, tmp_path, cena):
+    renderizar(cena, "-o", "inteira.png", "-w", 60, "-h", 40, "--no-cache")
+    renderizar(cena, "-o", "faixas.png", "-w", 60, "-h", 40, "--no-cache", "--strip", 7)
+    assert np.array_equal(imagem(tmp_path, "faixas000.png"), imagem(tmp_path, "inteira000.png"))
+
+
+@pytest.mark.parametrize("cena", ESTATICAS)
+def test_recorte_igual_a_imagem_inteira(renderizar, tmp_path, cena):
+    renderizar(cena, "-o", "inteira.png", "-w", 60, "-h", 40, "--no-cache")
+    renderizar(cena, "-o", "recorte.png", "-w", 60, "-h", 40, "--no-cache", "--crop", "13,9,25,17")
+    recorte = imagem(tmp_path, "recorte000.png")
+    assert recorte.shape[:2] == (17, 25)
+    assert np.array_equal(recorte, imagem(tmp_path, "inteira000.png")[9:26, 13:38])
+
+
+def test_quadros_incrementais_iguais_aos_avulsos(renderizar, tmp_path):
+    # Na animação só os blocos sujos são redesenhados; cada quadro tem de ser igual ao
+    # renderizado sozinho (tela inteira) no mesmo instante
+    cena = tmp_path / "cena.x3d"
+    cena.write_text(PARADO_E_MOVEL)
+    renderizar(cena, "-o", "animacao.png", "-w", 60, "-h", 40, "--fps", 1, "--frames", 3, "--no-cache")
+    for frame in range(3):
+        nome = "avulso%d.png" % frame
+        renderizar(cena, "-o", nome, "-w", 60, "-h", 40, "--fps", 1, "--start", frame, "--no-cache")
+        assert np.array_equal(imagem(tmp_path, "animacao%04d.png" % frame),
+                              imagem(tmp_path, nome.replace(".", "000."))), frame
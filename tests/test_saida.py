@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Testes dos escritores de quadros.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import io           # Vídeo gravado em memória
+
+import numpy as np
+import pytest
+
+import saida
+
+
+def test_cabecalho_y4m():
+    video = io.BytesIO()
+    escritor = saida.Y4MWriter(video, fps=30000 / 1001)
+    branco = np.full((2, 3, 3), 255, dtype=np.uint8)
+    preto = np.zeros((2, 3, 3), dtype=np.uint8)
+    escritor.write(branco)
+    escritor.write(preto)
+
+    cabecalho = b"YUV4MPEG2 W3 H2 F30000:1001 Ip A1:1 C444\n"
+    quadro = 2 * 3 * 3  # Y, Cb e Cr sem subamostragem (4:4:4)
+    dados = video.getvalue()
+    assert dados.startswith(cabecalho)
+    assert len(dados) == len(cabecalho) + 2 * (len(b"FRAME\n") + quadro)
+
+    quadros = dados[len(cabecalho):].split(b"FRAME\n")[1:]
+    assert list(quadros[0]) == [235] * 6 + [128] * 12  # faixa limitada do BT.601
+    assert list(quadros[1]) == [16] * 6 + [128] * 12
+
+    with pytest.raises(ValueError):
+        escritor.write(np.zeros((4, 3, 3), dtype=np.uint8))
+
+
+def test_taxa_inteira_y4m():
+    video = io.BytesIO()
+    saida.Y4MWriter(video, fps=24).write(np.zeros((4, 6, 3), dtype=np.uint8))
+    assert video.getvalue().startswith(b"YUV4MPEG2 W6 H4 F24:1 ")
+
+
+def pesos(tamanho, saida_tamanho):
+    """Matriz (saída, entrada) do filtro de caixa: área de cada pixel de entrada coberta."""
+    escala = tamanho / saida_tamanho
+    matriz = np.zeros((saida_tamanho, tamanho))
+    for i in range(saida_tamanho):
+        inicio, fim = i * escala, (i + 1) * escala
+        for j in range(tamanho):
+            matriz[i, j] = max(0.0, min(fim, j + 1) - max(inicio, j))
+    return matriz / escala
+
+
+@pytest.mark.parametrize("largura, altura", [(10, 5), (7, 3), (13, 11), (1, 1)])
+def test_reducao_por_area(largura, altura):
+    imagem = np.random.default_rng(0).random((20, 40, 3)) * 255
+    referencia = np.einsum("ij,jkc,lk->ilc", pesos(20, altura), imagem, pesos(40, largura))
+
+    reduzida = saida.area_resize(imagem, largura, altura)
+    assert reduzida.shape == (altura, largura, 3)
+    assert np.allclose(reduzida, referencia)
+
+    inteira = saida.area_resize(imagem.astype(np.uint8), largura, altura)
+    esperada = np.einsum("ij,jkc,lk->ilc", pesos(20, altura), imagem.astype(np.uint8), pesos(40, largura))
+    assert inteira.dtype == np.uint8
+    assert np.array_equal(inteira, np.rint(esperada))
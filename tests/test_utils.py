@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Testes das curvas pré-compiladas dos interpoladores.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import numpy as np
+import pytest
+
+import utils
+
+CHAVES = [0, 0.2, 0.45, 0.7, 1]
+POSICOES = [-2, 1, 0, 0, 3, 1, 2, 1, -1, 1, -2, 0, -2, 1, 0]
+ROTACOES = [0, 1, 0, 0, 0, 1, 0, 1.5, 1, 0, 0, 3.1, 0, 0, 1, 0.5, 0, 1, 0, 6.2]
+
+# Frações de um ciclo: entre as chaves, nas chaves e depois da última
+FRACOES = list(np.linspace(0, 1, 41)) + CHAVES + [1.2]
+
+
+def hermite(key, keyValue, closed, set_fraction):
+    """Catmull-Rom avaliada direto, com a busca linear das chaves (como antes da compilação)."""
+    k, s = len(key) - 1, 0
+    for i in range(len(key)):
+        if set_fraction < key[i]:
+            k = i - 1
+            s = (set_fraction - key[k]) / (key[k + 1] - key[k])
+            break
+
+    def ponto(i):
+        if 3 * i >= len(keyValue):
+            if not closed: return None
+            i -= len(keyValue) // 3
+        return np.array(keyValue[3 * i:3 * i + 3], dtype=float)
+
+    seguinte, depois = ponto(k + 1), ponto(k + 2)
+    if seguinte is None or depois is None: return [0, 0, 0]
+    anterior = ponto(k - 1) if k > 0 else np.zeros(3)
+    atual = ponto(k)
+    t0, t1 = (seguinte - anterior) / 2, (depois - atual) / 2
+    h = [2 * s ** 3 - 3 * s ** 2 + 1, -2 * s ** 3 + 3 * s ** 2, s ** 3 - 2 * s ** 2 + s, s ** 3 - s ** 2]
+    return list(h[0] * atual + h[1] * seguinte + h[2] * t0 + h[3] * t1)
+
+
+def rotacao(key, keyValue, set_fraction):
+    """Interpolação linear do ângulo com a busca linear das chaves."""
+    k, t = len(key) - 1, 0
+    for i in range(len(key)):
+        if set_fraction < key[i]:
+            k = i
+            t = (set_fraction - key[i - 1]) / (key[i] - key[i - 1])
+            break
+    anterior = keyValue[(k - 1) * 4 + 3]
+    return keyValue[k * 4:k * 4 + 3] + [anterior + t * (keyValue[k * 4 + 3] - anterior)]
+
+
+@pytest.mark.parametrize("closed", [False, True])
+def test_curva_de_hermite(closed):
+    curva = utils.HermiteCurve.compile(CHAVES, POSICOES, closed)
+    assert utils.HermiteCurve.compile(CHAVES, POSICOES, closed) is curva  # compilada uma vez
+
+    esperado = np.array([hermite(CHAVES, POSICOES, closed, f) for f in FRACOES])
+    assert np.allclose([curva.value(f) for f in FRACOES], esperado)
+    assert np.allclose(curva.evaluate(FRACOES), esperado)
+
+
+def test_curva_de_orientacao():
+    curva = utils.OrientationCurve.compile(CHAVES, ROTACOES)
+    assert utils.OrientationCurve.compile(CHAVES, ROTACOES) is curva
+
+    esperado = np.array([rotacao(CHAVES, ROTACOES, f) for f in FRACOES])
+    assert np.allclose([curva.value(f) for f in FRACOES], esperado)
+    assert np.allclose(curva.evaluate(FRACOES), esperado)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Testes do grafo de eventos (ROUTEs) das cenas X3D.
+
+Disciplina: Computação Gráfica
+Data: 19 de Outubro de 2026
+"""
+
+import numpy as np
+from PIL import Image
+
+import x3d
+
+from test_renderizador import PARADO_E_MOVEL
+
+# A cena PARADO_E_MOVEL com os ROUTEs e os nós de eventos na ordem inversa da cascata
+INVERTIDA = """<?xml version="1.0" encoding="UTF-8"?>
+<X3D>
+  <Scene>
+    <Viewpoint position="0 0 10"/>
+    <NavigationInfo headlight='false'/>
+    <ROUTE fromNode='caminho' fromField='value_changed' toNode='movel' toField='translation'/>
+    <Transform DEF='parado' translation='0 -1.5 0'>
+      <Shape>
+        <IndexedFaceSet coordIndex='0 1 2 -1'><Coordinate point='-1 -1 0  1 -1 0  0 1 0'/></IndexedFaceSet>
+        <Appearance><Material emissiveColor='1 0 0'/></Appearance>
+      </Shape>
+    </Transform>
+    <Transform DEF='movel'>
+      <Shape>
+        <IndexedFaceSet coordIndex='0 1 2 -1'><Coordinate point='-1 -1 0  1 -1 0  0 1 0'/></IndexedFaceSet>
+        <Appearance><Material emissiveColor='0 1 0'/></Appearance>
+      </Shape>
+    </Transform>
+    <SplinePositionInterpolator DEF='caminho' key='0 0.5 1' keyValue='-2 1 0  2 1 0  -2 1 0'/>
+    <ROUTE fromNode='relogio' fromField='fraction_changed' toNode='caminho' toField='set_fraction'/>
+    <TimeSensor DEF='relogio' cycleInterval='4' loop='true'/>
+  </Scene>
+</X3D>
+"""
+
+
+def test_ordem_da_cascata(tmp_path):
+    arquivo = tmp_path / "cena.x3d"
+    arquivo.write_text(INVERTIDA)
+    cena = x3d.X3D(str(arquivo))
+    cena.parse()
+
+    nos = cena.scene.children
+    routes = [no for no in nos if isinstance(no, x3d.ROUTE)]
+    eventos = [no for no in nos if isinstance(no, (x3d.X3DSensorNode, x3d.X3DInterpolatorNode))]
+    grafo = x3d.EventGraph(routes, eventos)
+    assert [no.name for no in grafo.order] == ["relogio", "caminho", "movel"]
+
+
+def test_cascata_em_uma_passada(renderizar, tmp_path):
+    # Fora da ordem do documento, cada quadro já mostra o valor do próprio instante: os
+    # quadros são os mesmos da cena com os nós na ordem da cascata
+    for nome, texto in (("ordem", PARADO_E_MOVEL), ("invertida", INVERTIDA)):
+        (tmp_path / (nome + ".x3d")).write_text(texto)
+        renderizar(tmp_path / (nome + ".x3d"), "-o", nome + ".png", "-w", 60, "-h", 40,
+                   "--fps", 1, "--frames", 3, "--no-cache")
+
+    for frame in range(3):
+        ordem = np.asarray(Image.open(tmp_path / ("ordem%04d.png" % frame)))
+        invertida = np.asarray(Image.open(tmp_path / ("invertida%04d.png" % frame)))
+        assert np.array_equal(ordem, invertida), frame